@@ -1,30 +1,55 @@
 import re
+import bisect
+import hashlib
+import heapq
+import sqlite3
+import time
+import zlib
+import subprocess
+import signal
+import tempfile
+from collections import OrderedDict, deque, namedtuple
+from itertools import groupby
+from contextlib import closing
 from pathlib import Path
-import fitz  # PyMuPDF
-import PyPDF2
 from datetime import datetime
 import json
 import csv
 import os
+import sys
+import importlib
 from tqdm import tqdm
 import multiprocessing
-import pytesseract
-from pdf2image import convert_from_path
-from PIL import Image
-import PIL.ImageEnhance
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers.lex_rank import LexRankSummarizer
-import nltk
-
-# Initialize NLTK data
-try:
-    nltk.download('punkt', quiet=True, download_dir='/Users/tv/nltk_data')
-    nltk.download('punkt_tab', quiet=True, download_dir='/Users/tv/nltk_data')
-    nltk.data.path.append('/Users/tv/nltk_data')
-except Exception as e:
-    print(f"Failed to download NLTK tokenizers: {e}")
-    print("Please run: /usr/bin/python3 -c \"import nltk; nltk.download('punkt'); nltk.download('punkt_tab')\"")
+import multiprocessing.connection
+
+# Heavy dependencies (PyMuPDF, PyPDF2, NumPy, pytesseract, Pillow, sumy and NLTK) are imported by
+# lazy_import when a stage first needs them, so that workers and short runs only pay for what they
+# use; IMPORT_SECONDS records what each import cost in this process.
+IMPORT_SECONDS = {}
+
+def lazy_import(name):
+    """Import module name on first use, recording the time taken in IMPORT_SECONDS."""
+    module = sys.modules.get(name)
+    if module is None:
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        IMPORT_SECONDS[name] = time.perf_counter() - started
+    return module
+
+# NLTK sentence tokenizer data used by the summariser, either of which will do. It is looked up
+# locally (including in $NLTK_DATA) and never downloaded; without it summaries use leading words.
+NLTK_TOKENIZERS = ["tokenizers/punkt_tab", "tokenizers/punkt"]
+
+def nltk_data_available():
+    """Whether the NLTK tokenizer data is installed locally."""
+    nltk = lazy_import("nltk")
+    for resource in NLTK_TOKENIZERS:
+        try:
+            nltk.data.find(resource)
+            return True
+        except LookupError:
+            pass
+    return False
 
 # Dictionary to convert written-out numbers to numeric percentages
 NUMBER_WORDS = {
@@ -37,42 +62,759 @@ NUMBER_WORDS = {
     'eighty': '80', 'ninety': '90', 'hundred': '100'
 }
 
+# Result cache settings. Bump EXTRACTOR_VERSION whenever a change to the extraction rules
+# alters the output, so that cached results from older rules are not reused.
+EXTRACTOR_VERSION = "6"
+CACHE_DIR = Path(os.environ.get("LPA_CACHE_DIR", Path.home() / ".cache" / "lpa_pdf_analysis")).expanduser()
+CACHE_MAX_BYTES = int(os.environ.get("LPA_CACHE_MAX_MB", "1024")) * 1024 * 1024
+
+class DiskCache:
+    """SQLite-backed JSON store keyed by string, evicting least recently used rows above max_bytes."""
+
+    def __init__(self, db_path, table, max_bytes):
+        self.db_path = Path(db_path)
+        self.table = table
+        self.max_bytes = max_bytes
+
+    def _connect(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} "
+            f"(key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        return conn
+
+    def get(self, key):
+        if self.max_bytes <= 0:
+            return None
+        try:
+            with closing(self._connect()) as conn, conn:
+                row = conn.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute(f"UPDATE {self.table} SET last_used = ? WHERE key = ?", (time.time(), key))
+            return json.loads(zlib.decompress(row[0]))
+        except Exception as e:
+            print(f"Cache read failed for {key}: {e}")
+            return None
+
+    def put(self, key, value):
+        if self.max_bytes <= 0:
+            return
+        blob = zlib.compress(json.dumps(value).encode("utf-8"))
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, blob, len(blob), time.time())
+                )
+                # Evict least recently used rows until the table fits in max_bytes
+                total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+                if total > self.max_bytes:
+                    for old_key, size in conn.execute(
+                        f"SELECT key, size FROM {self.table} ORDER BY last_used"
+                    ).fetchall():
+                        if total <= self.max_bytes:
+                            break
+                        conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (old_key,))
+                        total -= size
+        except Exception as e:
+            print(f"Cache write failed for {key}: {e}")
+
+result_cache = DiskCache(CACHE_DIR / "results.sqlite3", "cli_results", CACHE_MAX_BYTES)
+
+def file_sha256(pdf_path):
+    """SHA-256 of the PDF bytes, used as the content key for cached results."""
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Only the first DATE_SEARCH_PAGES pages are searched for a date
+DATE_SEARCH_PAGES = 5
+MONTH_NAMES = r"(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)"
+
+# Patterns the analysis looks for, as (token kind, pattern). Each pattern is matched exactly as it
+# would be on its own; group names are prefixed with their kind.
+TOKEN_PATTERNS = [
+    ("m4_2", r"M4\s*\(?\s*2\s*\)?|Category\s*2\s*(?:Accessible\s*and\s*Adaptable)?"),
+    ("m4_3", r"M4\s*\(?\s*3\s*\)?|Category\s*3\s*(?:Wheelchair\s*User\s*Dwellings)?"),
+    # pct_tail records whether a numeric percentage is followed by whitespace, which the
+    # percentage checks require (or the end of the sentence)
+    ("pct",
+     r"(?P<pct_digits>\d{1,3})\s*(?:%|\b(?:percent|per\s*cent)\b)(?P<pct_tail>(?=\s))?|"
+     r"(?:\b(?P<pct_word>ninety|ten|one\s*hundred)\s*(?:percent|per\s*cent)\b)"),
+    ("plan_period",
+     r"(?:Local\s*Plan|Core\s*Strategy|housing\s*requirement|plan\s*period).{0,200}?"
+     r"\b(?P<plan_start>\d{4})\s*[-–—]\s*(?P<plan_end>\d{4})\b"),
+    ("aa_keyword", r"accessible\s*and\s*adaptable\s*(?:dwellings|standard|standards)"),
+    ("wu_keyword", r"wheelchair\s*user\s*dwellings"),
+    ("special_phrase",
+     r"\b(?:all\s*other\s*dwellings|all\s*other\s*new\s*dwellings|all\s*remaining\s*new\s*dwellings|"
+     r"all\s*other\s*new\s*build|remainder\s*of\s*dwellings|all\s*new\s*build|all\s*new\s*dwellings|"
+     r"all\s*housing|all\s*homes|all\s*new\s*homes)\b"),
+]
+# Dates are only looked for on the first pages, so they have a scanner of their own
+DATE_PATTERNS = [
+    ("adopted",
+     r"\b[Aa]dopted(?:\s*(?:by|on|\())?\s*(?:(?:(?P<adopted_day>\d{1,2})\s+)?"
+     r"(?P<adopted_month>" + MONTH_NAMES + r")\s*)?(?P<adopted_year>\d{4})\b(?:\))?"),
+    ("proposed",
+     r"\b(?:[Pp]roposed|[Pp]roposal|[Dd]raft)\b(?:\s*(?:in|on))?(?:[^0-9]*?)(?:(?P<proposed_day>\d{1,2})\s+)?"
+     r"(?P<proposed_month>" + MONTH_NAMES + r")\s*(?P<proposed_year>\d{4})\b"),
+    ("date", r"\b(?:(?P<date_day>\d{1,2})\s+)?(?P<date_month>" + MONTH_NAMES + r")\s*(?P<date_year>\d{4})\b"),
+]
+
+def build_scanner(patterns, starts):
+    """Compile (kind, pattern) pairs into one regex that tries every pattern at each position.
+
+    starts must match (case-insensitively) the first characters of every possible token; it lets
+    the scanner skip all other positions cheaply. No two of the patterns can match at the same
+    position, so each kind sees every match it would see on its own.
+    """
+    alternatives = "|".join(f"(?P<{kind}>{pattern})" for kind, pattern in patterns)
+    return re.compile(f"(?={starts})(?={alternatives})", re.IGNORECASE)
+
+TOKEN_SCANNER = build_scanner(TOKEN_PATTERNS, r"\d|m4|ca|co|lo|ho|pl|ac|al|wh|re|te|ni|on")
+DATE_SCANNER = build_scanner(DATE_PATTERNS, r"\d|ad|pr|dr|ja|fe|ma|ap|ju|au|se|oc|no|de")
+ALL_NEW_HOMES = re.compile(r"all\s*new\s*homes", re.IGNORECASE)
+STANDARD_KINDS = {"M4(2)": ("m4_2", "m4_3"), "M4(3)": ("m4_3", "m4_2")}  # (standard, opposite)
+KEYWORD_KINDS = {"M4(2)": ("aa_keyword", "wu_keyword"), "M4(3)": ("wu_keyword", "aa_keyword")}
+
+Token = namedtuple("Token", "kind start end match")
+
+# Characters that end a sentence for the percentage checks (which split on "." or ".;")
+SENTENCE_DELIMITERS = ".;"
+SENTENCE_BREAK = re.compile(f"[{re.escape(SENTENCE_DELIMITERS)}]")
+
+def scan_tokens(text, scanner=TOKEN_SCANNER):
+    """Scan text once, returning its tokens in order; each kind is non-overlapping, as with finditer."""
+    tokens = []
+    kind_ends = {}
+    for match in scanner.finditer(text):
+        kind = match.lastgroup
+        start, end = match.span(kind)
+        if start < kind_ends.get(kind, 0):
+            continue
+        kind_ends[kind] = end
+        tokens.append(Token(kind, start, end, match))
+    return tokens
+
+def percent_value(token):
+    """The percentage of a "pct" token, e.g. "25%" ("Unknown%" for unrecognised number words)."""
+    digits = token.match.group("pct_digits")
+    if digits:
+        return digits + "%"
+    return NUMBER_WORDS.get(token.match.group("pct_word").lower(), "Unknown") + "%"
+
+def strict_percent_end(token, sentence_end):
+    """End of a "pct" token under the percentage checks' rule that a numeric percentage must be
+    followed by whitespace (which the match includes) or the sentence end; None if it is not."""
+    if token.match.group("pct_word") is not None or token.end >= sentence_end:
+        return token.end
+    if token.match.group("pct_tail") is not None:
+        return token.end + 1
+    return None
+
+def first_token(tokens, kind):
+    """The first token of the given kind, or None."""
+    return next((token for token in tokens if token.kind == kind), None)
+
+def has_date(text, page_num):
+    """Whether the text of page page_num contains a date extract_metadata would use."""
+    kinds = {token.kind for token in scan_tokens(text, DATE_SCANNER)}
+    return "adopted" in kinds or "proposed" in kinds or (page_num == 1 and "date" in kinds)
+
+# OCR settings. A page is sent to OCR only when its text layer is (almost) empty and embedded
+# images cover enough of it to plausibly hold scanned text; text-bearing pages are never rasterised.
+OCR_MAX_TEXT_CHARS = int(os.environ.get("LPA_OCR_MAX_TEXT_CHARS", "20"))
+OCR_MIN_IMAGE_COVERAGE = float(os.environ.get("LPA_OCR_MIN_IMAGE_COVERAGE", "0.3"))
+# Date pages are OCR'd at the first DPI step and re-OCR'd at the next step only while Tesseract finds
+# words with a mean confidence below OCR_MIN_CONFIDENCE; other pages are OCR'd once at the last step
+OCR_DPI_STEPS = [int(dpi) for dpi in os.environ.get("LPA_OCR_DPI_STEPS", "200,300,400").split(",")]
+OCR_MIN_CONFIDENCE = float(os.environ.get("LPA_OCR_MIN_CONFIDENCE", "70"))
+OCR_LANG = "eng"
+OCR_PSM = int(os.environ.get("LPA_OCR_PSM", "3"))  # Tesseract page segmentation mode
+# Preprocessing: Otsu binarisation, deskew within +/-OCR_MAX_SKEW degrees, cropping to the ink with
+# an OCR_CROP_MARGIN inch margin, and downscaling so text lines are at most OCR_MAX_LINE_HEIGHT px
+OCR_MAX_SKEW = 5.0
+OCR_SKEW_STEP = 0.25
+OCR_CROP_MARGIN = 0.1
+OCR_MAX_LINE_HEIGHT = 60
+# Describes the preprocessing and Tesseract settings; it is part of the OCR cache key, so change
+# it whenever either changes.
+OCR_PREPROCESSING = (
+    f"otsu;deskew={OCR_MAX_SKEW}/{OCR_SKEW_STEP};crop={OCR_CROP_MARGIN};line={OCR_MAX_LINE_HEIGHT};"
+    f"lang={OCR_LANG};psm={OCR_PSM};tsv"
+)
+OCR_WORD_BOXES = os.environ.get("LPA_OCR_WORD_BOXES", "0") == "1"
+
+# Tesseract is run over batches of OCR_BATCH_PAGES page images, each process limited to OCR_THREADS
+# threads. OCR_WORKERS caps the Tesseract processes running at once across all document workers.
+OCR_BATCH_PAGES = int(os.environ.get("LPA_OCR_BATCH_PAGES", "8"))
+OCR_THREADS = int(os.environ.get("LPA_OCR_THREADS", "1"))
+OCR_WORKERS = int(os.environ.get("LPA_OCR_WORKERS", str(multiprocessing.cpu_count())))
+ocr_slots = None  # set by init_ocr_worker in pool workers
+ocr_slot_held = None  # per-worker flag set while this worker holds one of the ocr_slots
+ocr_slot_changing = False  # True while a slot is being taken or returned and its flag updated
+stop_requested = False  # set by stop_worker when a stop has to wait for ocr_slot_changing
+
+# OCR'd page text is cached separately from results, so re-runs and extractor changes reuse it
+OCR_CACHE_MAX_BYTES = int(os.environ.get("LPA_OCR_CACHE_MAX_MB", "512")) * 1024 * 1024
+ocr_cache = DiskCache(CACHE_DIR / "ocr.sqlite3", "ocr_pages", OCR_CACHE_MAX_BYTES)
+_tesseract_version = None
+
+def tesseract_version():
+    """Installed Tesseract version, looked up once per process for the OCR cache key."""
+    global _tesseract_version
+    if _tesseract_version is None:
+        try:
+            pytesseract = lazy_import("pytesseract")
+            _tesseract_version = str(pytesseract.get_tesseract_version())
+        except Exception:
+            _tesseract_version = "unknown"
+    return _tesseract_version
+
+# The OCR settings that change which pages are OCR'd and the text they give; part of the result
+# cache key, so that results extracted under other settings are not reused
+OCR_RESULT_SETTINGS = (
+    f"dpi={','.join(map(str, OCR_DPI_STEPS))};confidence={OCR_MIN_CONFIDENCE};"
+    f"text={OCR_MAX_TEXT_CHARS};coverage={OCR_MIN_IMAGE_COVERAGE};{OCR_PREPROCESSING}"
+)
+
+def result_cache_key(content_hash):
+    """Result cache key: document content, extraction rules and OCR settings."""
+    return f"{content_hash}:{EXTRACTOR_VERSION}:{OCR_RESULT_SETTINGS}"
+
+def ocr_cache_key(content_hash, page_num, dpi):
+    """OCR cache key: document content, page, render resolution, preprocessing and Tesseract version."""
+    return f"{content_hash}:{page_num}:{dpi}:{OCR_PREPROCESSING}:{tesseract_version()}"
+
+def classify_page(page, text):
+    """Return (needs_ocr, text_chars, image_coverage) for a PyMuPDF page and its text layer."""
+    fitz = lazy_import("fitz")
+    text_chars = len(text.strip())
+    page_area = abs(page.rect)
+    image_area = 0.0
+    for info in page.get_image_info():
+        image_area += abs(fitz.Rect(info["bbox"]) & page.rect)
+    image_coverage = min(1.0, image_area / page_area) if page_area else 0.0
+    needs_ocr = text_chars < OCR_MAX_TEXT_CHARS and image_coverage >= OCR_MIN_IMAGE_COVERAGE
+    return needs_ocr, text_chars, image_coverage
+
+def render_pages(pdf, page_numbers, dpi):
+    """Rasterise pages of an open PyMuPDF document one at a time, yielding (page_num, grayscale array).
+
+    Each array is a view of the pixmap's buffer rather than a copy, so it is only valid until
+    the next page is requested.
+    """
+    fitz = lazy_import("fitz")
+    np = lazy_import("numpy")
+    for page_num in page_numbers:
+        pixmap = pdf[page_num - 1].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        samples = np.frombuffer(pixmap.samples_mv, dtype=np.uint8)
+        yield page_num, samples.reshape(pixmap.height, pixmap.stride)[:, :pixmap.width]
+
+def init_ocr_worker(slots, held=None):
+    """Pool initializer: share the semaphore that sizes the Tesseract pool across document workers.
+
+    held is an optional shared flag through which a supervisor can tell whether this worker holds a
+    slot, so that it can release the slot if it has to kill the worker.
+    """
+    global ocr_slots, ocr_slot_held
+    ocr_slots = slots
+    ocr_slot_held = held
+
+def stop_worker(signum, frame):
+    """SIGTERM handler of supervised workers: exit at once, or just after the worker has finished
+    taking or returning an OCR slot, so that ocr_slot_held always tells the supervisor whether it
+    has to release a slot for the worker."""
+    global stop_requested
+    if ocr_slot_changing:
+        stop_requested = True
+    else:
+        os._exit(1)
+
+def acquire_ocr_slot():
+    """Take one of the ocr_slots and set ocr_slot_held, deferring any stop until both are done."""
+    global ocr_slot_changing
+    while True:
+        ocr_slot_changing = True
+        # A short timeout keeps a deferred stop from waiting long behind the other workers' OCR
+        acquired = ocr_slots.acquire(timeout=1.0)
+        if acquired and ocr_slot_held is not None:
+            ocr_slot_held.value = 1
+        ocr_slot_changing = False
+        if stop_requested:
+            os._exit(1)
+        if acquired:
+            return
+
+def release_ocr_slot():
+    """Clear ocr_slot_held and return the slot, deferring any stop until both are done."""
+    global ocr_slot_changing
+    ocr_slot_changing = True
+    if ocr_slot_held is not None:
+        ocr_slot_held.value = 0
+    ocr_slots.release()
+    ocr_slot_changing = False
+    if stop_requested:
+        os._exit(1)
+
+def otsu_threshold(gray):
+    """Otsu's global threshold for a uint8 array: the level maximising between-class variance."""
+    np = lazy_import("numpy")
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight_dark = np.cumsum(hist)
+    weight_light = weight_dark[-1] - weight_dark
+    sum_dark = np.cumsum(hist * levels)
+    mean_dark = sum_dark / np.maximum(weight_dark, 1)
+    mean_light = (sum_dark[-1] - sum_dark) / np.maximum(weight_light, 1)
+    return int(np.argmax(weight_dark * weight_light * (mean_dark - mean_light) ** 2))
+
+def estimate_skew(ink):
+    """Skew in degrees whose sheared row projection of the ink is sharpest (text lines level)."""
+    np = lazy_import("numpy")
+    step = max(1, max(ink.shape) // 1000)  # a ~1000 px sample is plenty for the angle
+    ys, xs = np.nonzero(ink[::step, ::step])
+    if len(ys) < 100:
+        return 0.0
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-OCR_MAX_SKEW, OCR_MAX_SKEW + OCR_SKEW_STEP / 2, OCR_SKEW_STEP):
+        rows = np.round(ys - xs * np.tan(np.radians(angle))).astype(np.intp)
+        profile = np.bincount(rows - rows.min()).astype(np.float64)
+        score = float(np.dot(profile, profile))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+def median_line_height(ink):
+    """Median height in pixels of the runs of rows containing ink, i.e. of the text lines."""
+    np = lazy_import("numpy")
+    inked_rows = np.count_nonzero(ink, axis=1) > 0
+    edges = np.diff(np.concatenate(([0], inked_rows.astype(np.int8), [0])))
+    heights = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+    return float(np.median(heights)) if len(heights) else 0.0
+
+def preprocess_image(gray, dpi):
+    """Binarise, crop, deskew and downscale a grayscale page array for Tesseract.
+
+    Returns (image, effective_dpi), where effective_dpi is the resolution after downscaling.
+    """
+    Image = lazy_import("PIL.Image")
+    np = lazy_import("numpy")
+    ink = gray <= otsu_threshold(gray)
+
+    # Crop to the rows and columns holding ink, ignoring isolated specks near the edges
+    row_ink = np.flatnonzero(np.count_nonzero(ink, axis=1) >= max(2, ink.shape[1] // 500))
+    col_ink = np.flatnonzero(np.count_nonzero(ink, axis=0) >= max(2, ink.shape[0] // 500))
+    if len(row_ink) and len(col_ink):
+        margin = int(OCR_CROP_MARGIN * dpi)
+        top, bottom = max(0, row_ink[0] - margin), min(ink.shape[0], row_ink[-1] + margin + 1)
+        left, right = max(0, col_ink[0] - margin), min(ink.shape[1], col_ink[-1] + margin + 1)
+        ink = ink[top:bottom, left:right]
+
+    image = Image.fromarray(np.where(ink, 0, 255).astype(np.uint8))
+    angle = estimate_skew(ink)
+    if abs(angle) >= OCR_SKEW_STEP:
+        image = image.rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+        ink = np.asarray(image) < 128
+
+    # Line heights are measured after deskewing, when text lines no longer overlap row-wise
+    scale = min(1.0, OCR_MAX_LINE_HEIGHT / max(median_line_height(ink), 1.0))
+    if scale < 1.0:
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.BOX)
+    return image, max(1, round(dpi * scale))
+
+def run_tesseract(image_paths, work_dir):
+    """Run one Tesseract process over a list file of page images and return one OCR entry per image.
+
+    Each entry holds the page text, the mean word confidence and, when LPA_OCR_WORD_BOXES=1,
+    the word boxes as [word, left, top, width, height, confidence] lists.
+    """
+    pytesseract = lazy_import("pytesseract")
+    list_file = os.path.join(work_dir, "pages.txt")
+    with open(list_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(image_paths) + "\n")
+    output_base = os.path.join(work_dir, "ocr")
+    command = [
+        pytesseract.pytesseract.tesseract_cmd, list_file, output_base,
+        "-l", OCR_LANG, "--psm", str(OCR_PSM), "tsv"
+    ]
+    env = dict(os.environ, OMP_THREAD_LIMIT=str(OCR_THREADS))
+    if ocr_slots is not None:
+        acquire_ocr_slot()
+    try:
+        completed = subprocess.run(command, env=env, capture_output=True)
+    finally:
+        if ocr_slots is not None:
+            release_ocr_slot()
+    if completed.returncode != 0:
+        raise RuntimeError(f"tesseract exited with {completed.returncode}: {completed.stderr.decode(errors='replace').strip()}")
+
+    # TSV rows are in reading order; level 5 rows are words, numbered by page within the batch
+    entries = [{"text": "", "words": []} for _ in image_paths]
+    page_lines = [{} for _ in image_paths]
+    with open(output_base + ".tsv", encoding="utf-8") as f:
+        for row in csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if row["level"] != "5" or not (row["text"] or "").strip():
+                continue
+            index = int(row["page_num"]) - 1
+            line_key = (int(row["block_num"]), int(row["par_num"]), int(row["line_num"]))
+            page_lines[index].setdefault(line_key, []).append(row["text"])
+            entries[index]["words"].append([
+                row["text"], int(row["left"]), int(row["top"]),
+                int(row["width"]), int(row["height"]), float(row["conf"])
+            ])
+    for entry, lines in zip(entries, page_lines):
+        # One text line per OCR line, with a blank line between paragraphs
+        parts = []
+        previous_paragraph = None
+        for (block_num, par_num, _), words in lines.items():
+            if previous_paragraph is not None and previous_paragraph != (block_num, par_num):
+                parts.append("\n")
+            parts.append(" ".join(words) + "\n")
+            previous_paragraph = (block_num, par_num)
+        entry["text"] = "".join(parts)
+        confidences = [word[5] for word in entry["words"] if word[5] >= 0]
+        entry["confidence"] = sum(confidences) / len(confidences) if confidences else 0.0
+        if not OCR_WORD_BOXES:
+            del entry["words"]
+    return entries
+
+def ocr_document_pages(pdf, page_numbers, dpi, debug_text):
+    """OCR pages of an open PyMuPDF document in Tesseract batches, yielding (page_num, entry).
+
+    Pages are rendered at dpi one at a time straight to temporary image files, so at most one page
+    image is held in memory. Failed batches are reported in debug_text and skipped.
+    """
+    with tempfile.TemporaryDirectory(prefix="lpa_ocr_") as work_dir:
+        for i in range(0, len(page_numbers), OCR_BATCH_PAGES):
+            batch = page_numbers[i:i + OCR_BATCH_PAGES]
+            try:
+                image_paths = []
+                for page_num, gray in render_pages(pdf, batch, dpi):
+                    image, effective_dpi = preprocess_image(gray, dpi)
+                    image_path = os.path.join(work_dir, f"page_{page_num}.png")
+                    image.save(image_path, compress_level=1, dpi=(effective_dpi, effective_dpi))
+                    image_paths.append(image_path)
+                entries = run_tesseract(image_paths, work_dir)
+            except Exception as e:
+                debug_text.append(f"OCR failed on pages {batch[0]}-{batch[-1]}: {e}\n")
+                continue
+            yield from zip(batch, entries)
+
+def ocr_cached(pdf, page_numbers, dpi, content_hash, debug_text):
+    """OCR pages at dpi through the OCR cache, returning {page_num: entry} for the pages that succeeded."""
+    entries = {}
+    to_render = []
+    for page_num in page_numbers:
+        cached = ocr_cache.get(ocr_cache_key(content_hash, page_num, dpi))
+        if cached is None:
+            to_render.append(page_num)
+        else:
+            entries[page_num] = cached
+    for page_num, entry in ocr_document_pages(pdf, to_render, dpi, debug_text):
+        ocr_cache.put(ocr_cache_key(content_hash, page_num, dpi), entry)
+        entries[page_num] = entry
+    for page_num in page_numbers:
+        if page_num in entries:
+            source = "cache" if page_num not in to_render else "Tesseract"
+            debug_text.append(
+                f"Page {page_num}: OCR at {dpi} dpi from {source}, "
+                f"confidence {entries[page_num].get('confidence', 0.0):.0f}\n"
+            )
+    return entries
+
+# Summaries. LexRank's similarity matrix is quadratic in the number of sentences, so texts of more
+# than SUMMARY_MAX_SENTENCES sentences, and all texts once LexRank has taken SUMMARY_BUDGET_SECONDS
+# on the current document, are summarised by their leading words instead
+SUMMARY_MAX_SENTENCES = int(os.environ.get("LPA_SUMMARY_MAX_SENTENCES", "40"))
+SUMMARY_BUDGET_SECONDS = float(os.environ.get("LPA_SUMMARY_BUDGET_SECONDS", "5"))
+SUMMARY_CACHE_SIZE = 1024  # summaries memoised per process
+
+def lead_words(text, max_words):
+    """The first max_words words of text, followed by "..." if it is cut short."""
+    words = text.split()
+    if len(words) > max_words:
+        return " ".join(words[:max_words]) + "..."
+    return text
+
+class Summarizer:
+    """LexRank summariser reusing one tokenizer and summariser per process, with an LRU memo of
+    summaries keyed by text hash and a per-document time budget."""
+
+    def __init__(self):
+        self._available = None  # whether the NLTK data is installed, once checked
+        self._tokenizer = None
+        self._lex_rank = None
+        self._memo = OrderedDict()
+        self.start_document()
+
+    def _load(self):
+        """Build the tokenizer and summariser on first use; False if the NLTK data is missing."""
+        if self._available is None:
+            if not nltk_data_available():
+                print("NLTK tokenizer data not found, so summaries will use leading words. Install it with: "
+                      f"{sys.executable} -m nltk.downloader punkt_tab")
+                self._available = False
+            else:
+                self._tokenizer = lazy_import("sumy.nlp.tokenizers").Tokenizer("english")
+                self._lex_rank = lazy_import("sumy.summarizers.lex_rank").LexRankSummarizer()
+                self._available = True
+        return self._available
+
+    def start_document(self):
+        """Reset the time budget and counts for the next document.
+
+        fell_back records whether any summary of the document used leading words because the
+        budget ran out or the NLTK data is missing, which depends on the machine rather than the text.
+        """
+        self.spent = 0.0
+        self.counts = {"LexRank": 0, "memoised": 0, "leading words": 0}
+        self.fell_back = False
+
+    def summarize(self, text, max_words=50):
+        key = (hashlib.sha256(text.encode("utf-8")).digest(), max_words)
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            self.counts["memoised"] += 1
+            return self._memo[key]
+        if self.spent >= SUMMARY_BUDGET_SECONDS or not self._load():
+            self.counts["leading words"] += 1
+            self.fell_back = True
+            return lead_words(text, max_words)
+        PlaintextParser = lazy_import("sumy.parsers.plaintext").PlaintextParser
+        started = time.perf_counter()
+        try:
+            document = PlaintextParser.from_string(text, self._tokenizer).document
+            if len(document.sentences) > SUMMARY_MAX_SENTENCES:
+                self.counts["leading words"] += 1
+                return lead_words(text, max_words)
+            summary = self._lex_rank(document, sentences_count=1)
+            summary_text = lead_words(" ".join(str(sentence) for sentence in summary), max_words)
+        finally:
+            self.spent += time.perf_counter() - started
+        self.counts["LexRank"] += 1
+        self._memo[key] = summary_text
+        if len(self._memo) > SUMMARY_CACHE_SIZE:
+            self._memo.popitem(last=False)
+        return summary_text
+
+summarizer = Summarizer()
+
 def summarize_text(text, max_words=50):
     """Summarize text using sumy's LexRankSummarizer."""
     try:
-        parser = PlaintextParser.from_string(text, Tokenizer("english"))
-        summarizer = LexRankSummarizer()
-        summary = summarizer(parser.document, sentences_count=1)
-        summary_text = " ".join(str(sentence) for sentence in summary)
-        words = summary_text.split()
-        if len(words) > max_words:
-            summary_text = " ".join(words[:max_words]) + "..."
-        return summary_text
+        return summarizer.summarize(text, max_words)
     except Exception as e:
+        summarizer.fell_back = True
         error_msg = f"Summary failed: {str(e)}\nInput text (first 200 chars): {text[:200]}..."
         print(error_msg)  # Log to terminal for debugging
         return error_msg
 
-def extract_metadata(pdf_path, output_dir):
+class DocumentText:
+    """Page texts for a single PDF, extracted once and shared by every processing stage."""
+
+    def __init__(self, pdf_path, pages, method, ocr_pages=(), ocr_failed=()):
+        self.pdf_path = pdf_path
+        self.pages = pages  # pages[0] is page 1
+        self.method = method  # "PyMuPDF" or "PyPDF2"
+        self.ocr_pages = set(ocr_pages)  # page numbers whose text came from OCR
+        self.ocr_failed = set(ocr_failed)  # page numbers that needed OCR but whose OCR failed
+        # Page-boundary index: page_starts[i] is the full_text offset where page page_numbers[i] begins
+        self.page_starts = []
+        self.page_numbers = []
+        offset = 0
+        for page_num, text in enumerate(pages, start=1):
+            if not text.strip():
+                continue
+            self.page_starts.append(offset)
+            self.page_numbers.append(page_num)
+            offset += len(text) + 1
+        self._full_text = None
+        self._tokens = None
+        self._token_starts = None
+        self._token_max_ends = None
+        self._sentences = None
+        self._proximity_scores = None
+
+    @property
+    def full_text(self):
+        """The non-blank pages, each followed by a space, joined on first use; pages holds the only
+        other copy of the text."""
+        if self._full_text is None:
+            self._full_text = " ".join([self.pages[page_num - 1] for page_num in self.page_numbers] + [""])
+        return self._full_text
+
+    def page_span(self, page_num):
+        """The full_text span [start, end) of page page_num, or None for a blank page."""
+        index = bisect.bisect_left(self.page_numbers, page_num)
+        if index == len(self.page_numbers) or self.page_numbers[index] != page_num:
+            return None
+        page_start = self.page_starts[index]
+        return page_start, page_start + len(self.pages[page_num - 1])
+
+    def tokens(self):
+        """Tokens of full_text, scanned once on first use."""
+        if self._tokens is None:
+            self._tokens = scan_tokens(self.full_text)
+            self._token_starts = [token.start for token in self._tokens]
+            # _token_max_ends[i] is the furthest end of tokens[:i], to spot tokens running into a page
+            self._token_max_ends = [0]
+            for token in self._tokens:
+                self._token_max_ends.append(max(self._token_max_ends[-1], token.end))
+        return self._tokens
+
+    def page_tokens(self, page_num):
+        """Tokens of the text of page page_num, with page offsets.
+
+        They are taken from the full_text tokens, except that a page with a token running across
+        either of its edges is scanned on its own, as the page alone may match differently there.
+        """
+        text = self.pages[page_num - 1]
+        span = self.page_span(page_num)
+        if span is None:
+            return scan_tokens(text)  # blank page, not part of full_text
+        tokens = self.tokens()
+        page_start, page_end = span
+        first = bisect.bisect_left(self._token_starts, page_start)
+        last = bisect.bisect_left(self._token_starts, page_end)
+        if self._token_max_ends[first] > page_start or self._token_max_ends[last] > page_end:
+            return scan_tokens(text)
+        return [token._replace(start=token.start - page_start, end=token.end - page_start) for token in tokens[first:last]]
+
+    def tokens_between(self, start, end):
+        """full_text tokens starting within the span [start, end)."""
+        tokens = self.tokens()
+        return tokens[bisect.bisect_left(self._token_starts, start):bisect.bisect_left(self._token_starts, end)]
+
+    def sentences(self):
+        """The SentenceIndex of full_text, built on first use and shared by the percentage checks."""
+        if self._sentences is None:
+            self._sentences = SentenceIndex(self)
+        return self._sentences
+
+    def proximity_scores(self):
+        """The ProximityScores of the document, computed on first use."""
+        if self._proximity_scores is None:
+            self._proximity_scores = ProximityScores(self)
+        return self._proximity_scores
+
+    def page_method(self, page_num):
+        """How the text of page page_num was obtained: "OCR" or the text-layer method."""
+        return "OCR" if page_num in self.ocr_pages else self.method
+
+def extract_pages(pdf, pdf_path, page_numbers, debug_text, content_hash=None):
+    """Extract the text of the given pages (a range of page numbers) of an open PyMuPDF document.
+
+    Only pages without a usable text layer are OCR'd, reusing cached OCR text for the document
+    content_hash (computed if not given). Returns (pages, ocr_pages, ocr_failed): the page texts in
+    order, the numbers of the pages whose text came from OCR, and those of the pages whose OCR failed.
+    """
+    pages = []
+    ocr_pages = []
+    for page_num in page_numbers:
+        page = pdf[page_num - 1]
+        text = page.get_text("text") or ""
+        needs_ocr, text_chars, image_coverage = classify_page(page, text)
+        if needs_ocr:
+            ocr_pages.append(page_num)
+            debug_text.append(
+                f"Page {page_num}: {text_chars} text characters, images cover "
+                f"{image_coverage:.0%}; sending to OCR\n"
+            )
+        pages.append(text)
+    first_page = page_numbers[0] if pages else 1
+
+    if ocr_pages and content_hash is None:
+        content_hash = file_sha256(pdf_path)
+    ocr_entries = {}
+
+    # Date pages first, one at a time from the lowest DPI: stop as soon as a date is found, escalate
+    # while the words found have low confidence, and move to the next page once OCR is confident or
+    # finds no words at all (maps, photos and blank scans gain nothing from a higher DPI)
+    for page_num in page_numbers:
+        if page_num > DATE_SEARCH_PAGES:
+            break
+        if page_num not in ocr_pages:
+            if has_date(pages[page_num - first_page], page_num):
+                break
+            continue
+        found_date = False
+        for dpi in OCR_DPI_STEPS:
+            entry = ocr_cached(pdf, [page_num], dpi, content_hash, debug_text).get(page_num)
+            if entry is None:
+                break
+            ocr_entries[page_num] = entry
+            found_date = has_date(entry["text"], page_num)
+            if found_date or not entry["text"].strip() or entry.get("confidence", 0.0) >= OCR_MIN_CONFIDENCE:
+                break
+        if found_date:
+            debug_text.append(f"Found a date on OCR'd page {page_num}; date pages done\n")
+            break
+
+    # Remaining pages in batches, in a single pass at the highest DPI step
+    remaining = [page_num for page_num in ocr_pages if page_num not in ocr_entries]
+    if remaining:
+        ocr_entries.update(ocr_cached(pdf, remaining, OCR_DPI_STEPS[-1], content_hash, debug_text))
+
+    ocr_done = sorted(ocr_entries)
+    for page_num in ocr_done:
+        pages[page_num - first_page] = ocr_entries[page_num]["text"]
+    ocr_failed = [page_num for page_num in ocr_pages if page_num not in ocr_entries]
+    return pages, ocr_done, ocr_failed
+
+def extract_document_text(pdf_path, debug_text, content_hash=None):
+    """Extract the text of every page in one pass, using PyMuPDF with a PyPDF2 fallback.
+
+    Pages are OCR'd as in extract_pages; PyPDF2 documents are not OCR'd because PyMuPDF could
+    not open them to classify or render their pages.
+    """
+    try:
+        fitz = lazy_import("fitz")
+        with fitz.open(pdf_path) as pdf:
+            pages, ocr_pages, ocr_failed = extract_pages(pdf, pdf_path, range(1, len(pdf) + 1), debug_text, content_hash)
+        return DocumentText(pdf_path, pages, "PyMuPDF", ocr_pages, ocr_failed)
+    except Exception as e:
+        debug_text.append(f"Error: PyMuPDF failed: {e}\n")
+    try:
+        PyPDF2 = lazy_import("PyPDF2")
+        with open(pdf_path, "rb") as file:
+            reader = PyPDF2.PdfReader(file)
+            pages = [page.extract_text() or "" for page in reader.pages]
+        return DocumentText(pdf_path, pages, "PyPDF2")
+    except Exception as e:
+        debug_text.append(f"Error: PyPDF2 failed: {e}\n")
+        return None
+
+def extract_pdf_shard(args):
+    """Extract the pages first_page to last_page of a large PDF with PyMuPDF, as one shard of the
+    document for process_pdf to merge. Returns (pages, ocr_pages, ocr_failed, debug_text), with pages
+    None if PyMuPDF failed, in which case the whole document is extracted again serially."""
+    pdf_path, first_page, last_page, content_hash = args
+    debug_text = []
+    try:
+        fitz = lazy_import("fitz")
+        with fitz.open(pdf_path) as pdf:
+            pages, ocr_pages, ocr_failed = extract_pages(
+                pdf, pdf_path, range(first_page, last_page + 1), debug_text, content_hash
+            )
+        return pages, ocr_pages, ocr_failed, debug_text
+    except Exception as e:
+        debug_text.append(f"Error: PyMuPDF failed on pages {first_page}-{last_page}: {e}\n")
+        return None, [], [], debug_text
+
+def extract_metadata(document, output_dir):
     """Extract Local Planning Authority, Date of Doc/Status, and Plan Period from PDF."""
+    pdf_path = document.pdf_path
     file_name = Path(pdf_path).stem
     authority_name = file_name
     pdf_url = str(pdf_path)
     
-    # Patterns for date extraction
-    adopted_pattern = re.compile(
-        r"\b[Aa]dopted(?:\s*(?:by|on|\())?\s*(?:(?:(\d{1,2})\s+)?((?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?))\s*)?(\d{4})\b(?:\))?",
-        re.IGNORECASE
-    )
-    proposed_pattern = re.compile(
-        r"\b(?:[Pp]roposed|[Pp]roposal|[Dd]raft)\b(?:\s*(?:in|on))?(?:[^0-9]*?)(?:(\d{1,2})\s+)?((?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?))\s*(\d{4})\b",
-        re.IGNORECASE
-    )
-    general_date_pattern = re.compile(
-        r"\b(?:(\d{1,2})\s+)?((?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?))\s*(\d{4})\b",
-        re.IGNORECASE
-    )
-
     # Dictionary to convert month abbreviations to full names
     MONTH_MAP = {
         'jan': 'January', 'january': 'January',
@@ -91,162 +833,51 @@ def extract_metadata(pdf_path, output_dir):
 
     doc_date = ""
     first_page_text = ""
-    full_text = ""
     debug_text = [f"Debugging date extraction for {pdf_path}\n"]
 
-    # Try PyMuPDF first
-    try:
-        with fitz.open(pdf_path) as pdf:
-            for page_num, page in enumerate(pdf, start=1):
-                if page_num > 5:
-                    break
-                text = page.get_text("text") or ""
-                full_text += text + " "
-                if page_num == 1:
-                    first_page_text = text
-                debug_text.append(f"Page {page_num} text (PyMuPDF): {text[:500]}...\n{'-'*50}\n")
-                
-                # Check for adopted date
-                adopted_match = adopted_pattern.search(text)
-                if adopted_match:
-                    day, month, year = adopted_match.groups()
-                    month = MONTH_MAP.get(month.lower(), month) if month else ""
-                    doc_date = f"Adopted {day + ' ' if day else ''}{month + ' ' if month else ''}{year}"
-                    debug_text.append(f"Found adopted date: {doc_date} on page {page_num} (PyMuPDF)\n")
-                    break
-                else:
-                    debug_text.append(f"No adopted date found on page {page_num} (PyMuPDF)\n")
-                
-                # Check for proposed/draft date
-                proposed_match = proposed_pattern.search(text)
-                if proposed_match:
-                    day, month, year = proposed_match.groups()
-                    month = MONTH_MAP.get(month.lower(), month)
-                    keyword = "Proposed" if "propos" in proposed_match.group(0).lower() else "Draft"
-                    doc_date = f"{keyword} {day + ' ' if day else ''}{month} {year}"
-                    debug_text.append(f"Found {keyword.lower()} date: {doc_date} on page {page_num} (PyMuPDF)\n")
-                else:
-                    debug_text.append(f"No proposed/draft date found on page {page_num} (PyMuPDF)\n")
-                
-                if proposed_match:
-                    break
-            
-            # If no adopted/proposed date, check for general date on first page
-            if not doc_date and first_page_text:
-                general_match = general_date_pattern.search(first_page_text)
-                if general_match:
-                    day, month, year = general_match.groups()
-                    month = MONTH_MAP.get(month.lower(), month)
-                    doc_date = f"{day + ' ' if day else ''}{month} {year}"
-                    debug_text.append(f"Found general date: {doc_date} on first page (PyMuPDF)\n")
-                else:
-                    debug_text.append(f"No general date found on first page (PyMuPDF)\n")
-    
-    except Exception as e:
-        debug_text.append(f"PyMuPDF failed: {e}\n")
-        # Try PyPDF2
-        try:
-            with open(pdf_path, "rb") as file:
-                reader = PyPDF2.PdfReader(file)
-                for page_num in range(min(5, len(reader.pages))):
-                    text = reader.pages[page_num].extract_text() or ""
-                    full_text += text + " "
-                    if page_num == 0:
-                        first_page_text = text
-                    debug_text.append(f"Page {page_num + 1} text (PyPDF2): {text[:500]}...\n{'-'*50}\n")
-                    
-                    # Check for adopted date
-                    adopted_match = adopted_pattern.search(text)
-                    if adopted_match:
-                        day, month, year = adopted_match.groups()
-                        month = MONTH_MAP.get(month.lower(), month) if month else ""
-                        doc_date = f"Adopted {day + ' ' if day else ''}{month + ' ' if month else ''}{year}"
-                        debug_text.append(f"Found adopted date: {doc_date} on page {page_num + 1} (PyPDF2)\n")
-                        break
-                    
-                    # Check for proposed/draft date
-                    proposed_match = proposed_pattern.search(text)
-                    if proposed_match:
-                        day, month, year = proposed_match.groups()
-                        month = MONTH_MAP.get(month.lower(), month)
-                        keyword = "Proposed" if "propos" in proposed_match.group(0).lower() else "Draft"
-                        doc_date = f"{keyword} {day + ' ' if day else ''}{month} {year}"
-                        debug_text.append(f"Found {keyword.lower()} date: {doc_date} on page {page_num + 1} (PyPDF2)\n")
-                    else:
-                        debug_text.append(f"No proposed/draft date found on page {page_num + 1} (PyPDF2)\n")
-                    
-                    if proposed_match:
-                        break
-                
-                # If no adopted/proposed date, check for general date on first page
-                if not doc_date and first_page_text:
-                    general_match = general_date_pattern.search(first_page_text)
-                    if general_match:
-                        day, month, year = general_match.groups()
-                        month = MONTH_MAP.get(month.lower(), month)
-                        doc_date = f"{day + ' ' if day else ''}{month} {year}"
-                        debug_text.append(f"Found general date: {doc_date} on first page (PyPDF2)\n")
-                    else:
-                        debug_text.append(f"No general date found on first page (PyPDF2)\n")
-        except Exception as e:
-            debug_text.append(f"PyPDF2 failed: {e}\n")
-
-    # Try OCR as a fallback if no date was found or first page text is empty
-    if not doc_date or not first_page_text:
-        debug_text.append(f"Attempting OCR for {pdf_path}\n")
-        try:
-            # Convert first 5 pages to images
-            images = convert_from_path(pdf_path, first_page=1, last_page=5, dpi=400)
-            ocr_first_page_text = ""
-            ocr_full_text = ""
-            for page_num, image in enumerate(images, start=1):
-                # Preprocess image: convert to grayscale and enhance contrast
-                image = image.convert('L')  # Grayscale
-                enhancer = PIL.ImageEnhance.Contrast(image)
-                image = enhancer.enhance(2.0)  # Increase contrast
-                # Perform OCR
-                text = pytesseract.image_to_string(image, lang='eng')
-                ocr_full_text += text + " "
-                if page_num == 1:
-                    ocr_first_page_text = text
-                debug_text.append(f"Page {page_num} text (OCR): {text[:500]}...\n{'-'*50}\n")
-                
-                # Check for adopted date
-                adopted_match = adopted_pattern.search(text)
-                if adopted_match:
-                    day, month, year = adopted_match.groups()
-                    month = MONTH_MAP.get(month.lower(), month) if month else ""
-                    doc_date = f"Adopted {day + ' ' if day else ''}{month + ' ' if month else ''}{year}"
-                    debug_text.append(f"Found adopted date: {doc_date} on page {page_num} (OCR)\n")
-                    break
-                
-                # Check for proposed/draft date
-                proposed_match = proposed_pattern.search(text)
-                if proposed_match:
-                    day, month, year = proposed_match.groups()
-                    month = MONTH_MAP.get(month.lower(), month)
-                    keyword = "Proposed" if "propos" in proposed_match.group(0).lower() else "Draft"
-                    doc_date = f"{keyword} {day + ' ' if day else ''}{month} {year}"
-                    debug_text.append(f"Found {keyword.lower()} date: {doc_date} on page {page_num} (OCR)\n")
-                else:
-                    debug_text.append(f"No proposed/draft date found on page {page_num} (OCR)\n")
-                
-                if proposed_match:
-                    break
-            
-            # If no adopted/proposed date, check for general date on first page
-            if not doc_date and ocr_first_page_text:
-                general_match = general_date_pattern.search(ocr_first_page_text)
-                if general_match:
-                    day, month, year = general_match.groups()
-                    month = MONTH_MAP.get(month.lower(), month)
-                    doc_date = f"{day + ' ' if day else ''}{month} {year}"
-                    debug_text.append(f"Found general date: {doc_date} on first page (OCR)\n")
-                else:
-                    debug_text.append(f"No general date found on first page (OCR)\n")
+    # Search the first pages of the shared page texts; scanned pages already hold OCR text
+    for page_num, text in enumerate(document.pages[:DATE_SEARCH_PAGES], start=1):
+        method = document.page_method(page_num)
+        if page_num == 1:
+            first_page_text = text
+        debug_text.append(f"Page {page_num} text ({method}): {text[:500]}...\n{'-'*50}\n")
         
-        except Exception as e:
-            debug_text.append(f"OCR failed: {e}\n")
+        # Check for adopted date
+        page_tokens = scan_tokens(text, DATE_SCANNER)
+        adopted_match = first_token(page_tokens, "adopted")
+        if adopted_match:
+            day, month, year = adopted_match.match.group("adopted_day", "adopted_month", "adopted_year")
+            month = MONTH_MAP.get(month.lower(), month) if month else ""
+            doc_date = f"Adopted {day + ' ' if day else ''}{month + ' ' if month else ''}{year}"
+            debug_text.append(f"Found adopted date: {doc_date} on page {page_num} ({method})\n")
+            break
+        else:
+            debug_text.append(f"No adopted date found on page {page_num} ({method})\n")
+        
+        # Check for proposed/draft date
+        proposed_match = first_token(page_tokens, "proposed")
+        if proposed_match:
+            day, month, year = proposed_match.match.group("proposed_day", "proposed_month", "proposed_year")
+            month = MONTH_MAP.get(month.lower(), month)
+            keyword = "Proposed" if "propos" in proposed_match.match.group("proposed").lower() else "Draft"
+            doc_date = f"{keyword} {day + ' ' if day else ''}{month} {year}"
+            debug_text.append(f"Found {keyword.lower()} date: {doc_date} on page {page_num} ({method})\n")
+        else:
+            debug_text.append(f"No proposed/draft date found on page {page_num} ({method})\n")
+        
+        if proposed_match:
+            break
+    
+    # If no adopted/proposed date, check for general date on first page
+    if not doc_date and first_page_text:
+        general_match = first_token(scan_tokens(first_page_text, DATE_SCANNER), "date")
+        if general_match:
+            day, month, year = general_match.match.group("date_day", "date_month", "date_year")
+            month = MONTH_MAP.get(month.lower(), month)
+            doc_date = f"{day + ' ' if day else ''}{month} {year}"
+            debug_text.append(f"Found general date: {doc_date} on first page ({document.page_method(1)})\n")
+        else:
+            debug_text.append(f"No general date found on first page ({document.page_method(1)})\n")
 
     # Set to "Unknown" if no date was found
     if not doc_date:
@@ -260,130 +891,226 @@ def extract_metadata(pdf_path, output_dir):
 
     return authority_name, doc_date, pdf_url
 
-def search_pdf_for_standards(pdf_path, output_dir):
-    """Search PDF for M4 standards, percentages, and plan periods."""
-    patterns = {
-        "M4(2)": re.compile(
-            r"M4\s*\(?\s*2\s*\)?|Category\s*2\s*(?:Accessible\s*and\s*Adaptable)?",
-            re.IGNORECASE
-        ),
-        "M4(3)": re.compile(
-            r"M4\s*\(?\s*3\s*\)?|Category\s*3\s*(?:Wheelchair\s*User\s*Dwellings)?",
-            re.IGNORECASE
-        ),
-        "Percentage Target": re.compile(
-            r"(\d{1,3})\s*(?:%|\b(?:percent|per\s*cent)\b)|"
-            r"(?:\b(ninety|ten|one\s*hundred)\s*(?:percent|per\s*cent)\b)",
-            re.IGNORECASE
-        ),
-        "Plan Period": re.compile(
-            r"(?:Local\s*Plan|Core\s*Strategy|housing\s*requirement|plan\s*period).{0,200}?\b(\d{4})\s*[-–—]\s*(\d{4})\b",
-            re.IGNORECASE
-        ),
-    }
+# A search match, as the span of the matched text on its page; context text is only made for output
+Match = namedtuple("Match", "page start end kind")
+CONTEXT_CHARS = 500  # context taken on either side of a match
 
-    results = {key: [] for key in patterns}
-    debug_text = [f"Extracted text from {pdf_path}\n\n"]
-    full_text = ""
+def search_pdf_for_standards(document, output_dir):
+    """Search PDF for M4 standards, percentages, and plan periods."""
+    kinds = {"M4(2)": "m4_2", "M4(3)": "m4_3", "Percentage Target": "pct", "Plan Period": "plan_period"}
+    results = {key: [] for key in kinds}
+    pdf_path = document.pdf_path
+    debug_text = [f"Extracted text from {pdf_path} ({document.method})\n\n"]
 
-    try:
-        with fitz.open(pdf_path) as pdf:
-            for page_num, page in enumerate(pdf, start=1):
-                text = page.get_text("text") or ""
-                if not text.strip():
-                    debug_text.append(f"Page {page_num}:\n[No text extracted]\n{'-'*50}\n")
+    for page_num, text in enumerate(document.pages, start=1):
+        if not text.strip():
+            debug_text.append(f"Page {page_num}:\n[No text extracted]\n{'-'*50}\n")
+            continue
+        debug_text.append(f"Page {page_num} ({document.page_method(page_num)}):\n{text}\n{'-'*50}\n")
+        page_tokens = document.page_tokens(page_num)
+        for key, kind in kinds.items():
+            for token in page_tokens:
+                if token.kind != kind:
                     continue
-                debug_text.append(f"Page {page_num}:\n{text}\n{'-'*50}\n")
-                full_text += text + " "
-                for key, pattern in patterns.items():
-                    matches = pattern.finditer(text)
-                    for match in matches:
-                        start = max(0, match.start() - 500)
-                        end = min(len(text), match.end() + 500)
-                        context = text[start:end].replace("\n", " ")
-                        results[key].append({"page": page_num, "match": match.group(), "context": context})
-    except Exception as e:
-        debug_text.append(f"Error: PyMuPDF failed: {e}\n")
-        try:
-            with open(pdf_path, "rb") as file:
-                reader = PyPDF2.PdfReader(file)
-                for page_num in range(len(reader.pages)):
-                    text = reader.pages[page_num].extract_text() or ""
-                    if not text.strip():
-                        debug_text.append(f"Page {page_num + 1}:\n[No text extracted]\n{'-'*50}\n")
-                        continue
-                    debug_text.append(f"Page {page_num + 1}:\n{text}\n{'-'*50}\n")
-                    full_text += text + " "
-                    for key, pattern in patterns.items():
-                        matches = pattern.finditer(text)
-                        for match in matches:
-                            start = max(0, match.start() - 500)
-                            end = min(len(text), match.end() + 500)
-                            context = text[start:end].replace("\n", " ")
-                            results[key].append({"page": page_num + 1, "match": match.group(), "context": context})
-        except Exception as e:
-            debug_text.append(f"Error: PyPDF2 failed: {e}\n")
-            return None, "", debug_text
+                results[key].append(Match(page_num, token.start, token.end, kind))
 
     debug_file = output_dir / f"extracted_text_{Path(pdf_path).stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
     with open(debug_file, "w", encoding="utf-8") as f:
         f.write("".join(debug_text))
 
-    return results, full_text, debug_text
+    return results, debug_text
 
-def find_page_number(full_text, sentence, pdf_path):
-    """Find the page number where a sentence appears."""
-    try:
-        with fitz.open(pdf_path) as pdf:
-            for page_num, page in enumerate(pdf, start=1):
-                text = page.get_text("text") or ""
-                if sentence in text:
-                    return page_num
-        return "Unknown"
-    except Exception:
+def match_contexts(document, matches):
+    """Context text for matches in page order: CONTEXT_CHARS either side of each match, with
+    overlapping contexts on the same page merged, and newlines replaced by spaces."""
+    windows = []  # [page, start, end]
+    for match in matches:
+        start = max(0, match.start - CONTEXT_CHARS)
+        end = min(len(document.pages[match.page - 1]), match.end + CONTEXT_CHARS)
+        if windows and windows[-1][0] == match.page and start <= windows[-1][2]:
+            windows[-1][2] = max(windows[-1][2], end)
+        else:
+            windows.append([match.page, start, end])
+    return [
+        {"page": page, "context": document.pages[page - 1][start:end].replace("\n", " ")}
+        for page, start, end in windows
+    ]
+
+class SentenceIndex:
+    """Sentences of a document's full_text, split on SENTENCE_DELIMITERS in a single pass and
+    indexed by the kinds of token they contain, so that checks only visit candidate sentences."""
+
+    def __init__(self, document):
+        self.document = document
+        self.breaks = [(match.start(), match.group()) for match in SENTENCE_BREAK.finditer(document.full_text)]
+        self._bounds = {}
+        self._kind_sentences = {}
+
+    def bounds(self, delimiters="."):
+        """Sentence boundaries for the delimiters: sentence i lies between bounds[i] and bounds[i + 1]."""
+        if delimiters not in self._bounds:
+            self._bounds[delimiters] = (
+                [-1] + [pos for pos, char in self.breaks if char in delimiters] + [len(self.document.full_text)]
+            )
+        return self._bounds[delimiters]
+
+    def sentence(self, index, delimiters="."):
+        """(sentence, start, end) of sentence index, stripped, with start and end its full_text offsets."""
+        bounds = self.bounds(delimiters)
+        raw = self.document.full_text[bounds[index] + 1:bounds[index + 1]]
+        sentence = raw.strip()
+        start = bounds[index] + 1 + len(raw) - len(raw.lstrip())
+        return sentence, start, start + len(sentence)
+
+    def candidates(self, kind, delimiters="."):
+        """(sentence, start, end) for each sentence containing a token of the given kind, in order."""
+        if delimiters not in self._kind_sentences:
+            # Tokens never start on a delimiter or whitespace, so each lies within one sentence
+            bounds = self.bounds(delimiters)
+            kind_sentences = {}
+            for token in self.document.tokens():
+                sentences = kind_sentences.setdefault(token.kind, [])
+                index = bisect.bisect_right(bounds, token.start) - 1
+                if not sentences or sentences[-1] != index:
+                    sentences.append(index)
+            self._kind_sentences[delimiters] = kind_sentences
+        for index in self._kind_sentences[delimiters].get(kind, []):
+            yield self.sentence(index, delimiters)
+
+# Offsets of the tokens of one kind as arrays: indices into DocumentText.tokens(), starts, ends
+# (for percentages, the end used by the checks) and the index of the sentence each is in
+TokenArrays = namedtuple("TokenArrays", "indices starts ends sentences")
+TRAILING_SPACE = re.compile(r"\s*")
+
+def nearest_in_sentence(values, value_sentences, queries, query_sentences):
+    """For each query, the index of the nearest of the sorted values in the query's sentence (the
+    lower one on a tie) and its distance; -1 and inf where that sentence has no values."""
+    np = lazy_import("numpy")
+    if len(values) == 0:
+        return np.full(len(queries), -1), np.full(len(queries), np.inf)
+    # The values in a sentence are a contiguous run [lo, hi); the nearest is next to the query's position
+    lo = np.searchsorted(value_sentences, query_sentences, "left")
+    hi = np.searchsorted(value_sentences, query_sentences, "right")
+    position = np.searchsorted(values, queries)
+    below = np.minimum(np.maximum(position - 1, lo), hi - 1)
+    above = np.minimum(np.maximum(position, lo), hi - 1)
+    below_distance = np.abs(queries - values[below])
+    above_distance = np.abs(values[above] - queries)
+    index = np.where(above_distance < below_distance, above, below)
+    distance = np.minimum(below_distance, above_distance)
+    found = hi > lo
+    return np.where(found, index, -1), np.where(found, distance, np.inf)
+
+class ProximityScores:
+    """Distances between the standard and keyword mentions of a document and the percentages in
+    their sentences, computed for both standards at once with NumPy and shared by the second and
+    third percentage checks, which only pick results out of them in their own order."""
+
+    def __init__(self, document):
+        np = lazy_import("numpy")
+        self.document = document
+        self.sentences = document.sentences()
+        self.tokens = document.tokens()
+        self.kind_indices = {}
+        for index, token in enumerate(self.tokens):
+            self.kind_indices.setdefault(token.kind, []).append(index)
+
+        # Third check: the percentage starting nearest each M4(2)/M4(3) mention
+        percents = self.percentages(".")
+        self.mention_percents = {}
+        for standard, (kind, _) in STANDARD_KINDS.items():
+            mentions = self.arrays(kind, ".")
+            nearest, distance = nearest_in_sentence(percents.starts, percents.sentences, mentions.starts, mentions.sentences)
+            self.mention_percents[standard] = (mentions, percents, nearest, distance)
+
+        # Second check: the distance from each percentage and special phrase to the nearest mention
+        # of each keyword, measured between a percentage and the far side of the keyword
+        percents = self.percentages(".;")
+        phrases = self.arrays("special_phrase", ".;")
+        self.keyword_percents = percents
+        self.keyword_phrases = phrases
+        self.percent_distance = {}
+        self.phrase_distance = {}
+        for kind, _ in KEYWORD_KINDS.values():
+            keywords = self.arrays(kind, ".;")
+            self.percent_distance[kind] = np.minimum(
+                nearest_in_sentence(keywords.ends, keywords.sentences, percents.starts, percents.sentences)[1],
+                nearest_in_sentence(keywords.starts, keywords.sentences, percents.ends, percents.sentences)[1],
+            )
+            self.phrase_distance[kind] = nearest_in_sentence(
+                keywords.starts, keywords.sentences, phrases.starts, phrases.sentences
+            )[1]
+        full_text = document.full_text
+        self.all_new_homes = np.array(
+            [bool(ALL_NEW_HOMES.fullmatch(full_text, start, end)) for start, end in zip(phrases.starts.tolist(), phrases.ends.tolist())],
+            dtype=bool,
+        )
+
+    def arrays(self, kind, delimiters):
+        """TokenArrays of the tokens of a kind, with sentences split on the delimiters."""
+        np = lazy_import("numpy")
+        indices = self.kind_indices.get(kind, [])
+        starts = np.array([self.tokens[i].start for i in indices], dtype=np.int64)
+        ends = np.array([self.tokens[i].end for i in indices], dtype=np.int64)
+        sentences = np.searchsorted(self.sentences.bounds(delimiters), starts, "right") - 1
+        return TokenArrays(np.array(indices, dtype=np.int64), starts, ends, sentences)
+
+    def percentages(self, delimiters):
+        """TokenArrays of the percentages the checks accept, with their strict_percent_end ends."""
+        np = lazy_import("numpy")
+        bounds = self.sentences.bounds(delimiters)
+        full_text = self.document.full_text
+        pct = self.arrays("pct", delimiters)
+        kept = []
+        ends = []
+        for position, (index, sentence) in enumerate(zip(pct.indices.tolist(), pct.sentences.tolist())):
+            token = self.tokens[index]
+            # The token ends its (stripped) sentence when only whitespace follows it there
+            sentence_end = bounds[sentence + 1]
+            if TRAILING_SPACE.match(full_text, token.end, sentence_end).end() == sentence_end:
+                sentence_end = token.end
+            end = strict_percent_end(token, sentence_end)
+            if end is not None:
+                kept.append(position)
+                ends.append(end)
+        kept = np.array(kept, dtype=np.int64)
+        return TokenArrays(pct.indices[kept], pct.starts[kept], np.array(ends, dtype=np.int64), pct.sentences[kept])
+
+def find_page_number(document, start, end):
+    """Find the page (or "first-last" page range) of the full_text span [start, end)."""
+    if not document.page_starts:
         return "Unknown"
+    first = document.page_numbers[bisect.bisect_right(document.page_starts, start) - 1]
+    last = document.page_numbers[bisect.bisect_right(document.page_starts, max(start, end - 1)) - 1]
+    return first if first == last else f"{first}-{last}"
 
-def find_percentage_in_context(standard, full_text, pdf_path, debug_text=None):
+def find_percentage_in_context(standard, document, debug_text=None):
     """Extract percentages for M4(2) or M4(3) from text sentences."""
-    standard_pattern = (
-        re.compile(r"M4\s*\(?\s*2\s*\)?|Category\s*2\s*(?:Accessible\s*and\s*Adaptable)?", re.IGNORECASE)
-        if standard == "M4(2)"
-        else re.compile(r"M4\s*\(?\s*3\s*\)?|Category\s*3\s*(?:Wheelchair\s*User\s*Dwellings)?", re.IGNORECASE)
-    )
-    opposite_pattern = (
-        re.compile(r"M4\s*\(?\s*3\s*\)?|Category\s*3\s*(?:Wheelchair\s*User\s*Dwellings)?", re.IGNORECASE)
-        if standard == "M4(2)"
-        else re.compile(r"M4\s*\(?\s*2\s*\)?|Category\s*2\s*(?:Accessible\s*and\s*Adaptable)?", re.IGNORECASE)
-    )
-    percent_pattern = re.compile(
-        r"(\d{1,3})\s*(?:%|\b(?:percent|per\s*cent)\b)(?:\s|$)|"
-        r"(?:\b(ninety|ten|one\s*hundred)\s*(?:percent|per\s*cent)\b)",
-        re.IGNORECASE
-    )
+    pdf_path = document.pdf_path
+    standard_kind, opposite_kind = STANDARD_KINDS[standard]
 
-    sentences = [s.strip() for s in full_text.split(".") if s.strip()]
     standard_percentages = []
     notes = []
 
-    for sentence in sentences:
-        if re.search(standard_pattern, sentence):
-            if re.search(opposite_pattern, sentence):
+    for sentence, sentence_start, sentence_end in document.sentences().candidates(standard_kind):
+        sentence_tokens = document.tokens_between(sentence_start, sentence_end)
+        kinds = {token.kind for token in sentence_tokens}
+        if standard_kind in kinds:
+            if opposite_kind in kinds:
                 if debug_text:
                     debug_text.append(
                         f"Skipped sentence in {Path(pdf_path).name}: '{sentence}' "
                         f"contains both {standard} and opposite standard.\n"
                     )
                 continue
-            percent_matches = percent_pattern.finditer(sentence)
             sentence_percentages = []
-            for match in percent_matches:
-                if match.group(1):
-                    percent = match.group(1) + "%"
-                elif match.group(2):
-                    percent = NUMBER_WORDS.get(match.group(2).lower(), "Unknown") + "%"
+            for token in sentence_tokens:
+                if token.kind != "pct" or strict_percent_end(token, sentence_end) is None:
+                    continue
+                percent = percent_value(token)
                 sentence_percentages.append(percent)
                 # Find page number and summarize if needed
-                page_num = find_page_number(full_text, sentence, pdf_path)
+                page_num = find_page_number(document, sentence_start, sentence_end)
                 sentence_words = len(sentence.split())
                 display_sentence = summarize_text(sentence, max_words=50) if sentence_words > 100 else sentence
                 notes.append({"page": page_num, "sentence": display_sentence})
@@ -404,162 +1131,94 @@ def find_percentage_in_context(standard, full_text, pdf_path, debug_text=None):
 
     return percentage, notes
 
-def second_check_percentage(standard, full_text, pdf_path, debug_text=None):
+def second_check_percentage(standard, document, debug_text=None):
     """Second check for percentages near M4(2) or M4(3) keywords."""
-    standard_keyword = re.compile(
-        r"accessible\s*and\s*adaptable\s*(dwellings|standard|standards)" if standard == "M4(2)"
-        else r"wheelchair\s*user\s*dwellings", re.IGNORECASE
-    )
-    opposite_keyword = re.compile(
-        r"wheelchair\s*user\s*dwellings" if standard == "M4(2)"
-        else r"accessible\s*and\s*adaptable\s*(dwellings|standard|standards)", re.IGNORECASE
-    )
-    percent_pattern = re.compile(
-        r"(\d{1,3})\s*(?:%|\b(?:percent|per\s*cent)\b)(?:\s|$)|"
-        r"(?:\b(ninety|ten|one\s*hundred)\s*(?:percent|per\s*cent)\b)",
-        re.IGNORECASE
-    )
-    special_phrases = re.compile(
-        r"\b(all\s*other\s*dwellings|all\s*other\s*new\s*dwellings|all\s*remaining\s*new\s*dwellings|all\s*other\s*new\s*build|remainder\s*of\s*dwellings|all\s*new\s*build|all\s*new\s*dwellings|all\s*housing|all\s*homes|all\s*new\s*homes)\b",
-        re.IGNORECASE
-    )
-    all_new_homes = re.compile(r"\b(all\s*new\s*homes)\b", re.IGNORECASE)
-
-    sentences = [s.strip() for s in re.split(r'[.;]', full_text) if s.strip()]
-    result = "N/A"
-    notes = []
-
-    for sentence in sentences:
-        if re.search(standard_keyword, sentence) and all_new_homes.search(sentence):
-            page_num = find_page_number(full_text, sentence, pdf_path)
-            sentence_words = len(sentence.split())
-            display_sentence = summarize_text(sentence, max_words=50) if sentence_words > 100 else sentence
-            notes.append({"page": page_num, "sentence": display_sentence})
-            if debug_text:
-                debug_text.append(
-                    f"Second check found 'all new homes' for {standard} on page {page_num} in {Path(pdf_path).name}: "
-                    f"'{sentence}' -> 100%\n"
-                )
-            return "100%", notes
+    np = lazy_import("numpy")
+    full_text, pdf_path = document.full_text, document.pdf_path
+    keyword_kind, opposite_kind = KEYWORD_KINDS[standard]
+    scores = document.proximity_scores()
+    phrases, percents = scores.keyword_phrases, scores.keyword_percents
 
-        standard_matches = [(m.start(), m.end(), m.group()) for m in re.finditer(standard_keyword, sentence)]
-        opposite_matches = [(m.start(), m.end(), m.group()) for m in re.finditer(opposite_keyword, sentence)]
-        percent_matches = [(m.start(), m.end(), m.group(1), m.group(2)) for m in percent_pattern.finditer(sentence)]
-        special_matches = [(m.start(), m.end(), m.group(1)) for m in special_phrases.finditer(sentence)]
+    # The first sentence with the keyword that holds "all new homes", a special phrase within 500
+    # characters of the keyword, or a percentage within 100 that is no nearer the opposite keyword
+    keyword_sentences = scores.arrays(keyword_kind, ".;").sentences
+    all_new_homes = scores.all_new_homes & np.isin(phrases.sentences, keyword_sentences)
+    near_phrases = scores.phrase_distance[keyword_kind] < 500
+    percent_distance = scores.percent_distance[keyword_kind]
+    near_percents = (percent_distance < 100) & (percent_distance <= scores.percent_distance[opposite_kind])
+    hits = np.concatenate([
+        phrases.sentences[all_new_homes], phrases.sentences[near_phrases], percents.sentences[near_percents]
+    ])
+    if not hits.size:
+        if debug_text:
+            debug_text.append(f"Second check: No valid result found for {standard} in {Path(pdf_path).name}\n")
+        return "N/A", []
 
-        if not standard_matches:
-            continue
+    sentence_index = hits.min()
+    sentence, sentence_start, sentence_end = document.sentences().sentence(sentence_index, ".;")
+    page_num = find_page_number(document, sentence_start, sentence_end)
+    sentence_words = len(sentence.split())
+    display_sentence = summarize_text(sentence, max_words=50) if sentence_words > 100 else sentence
+    notes = [{"page": page_num, "sentence": display_sentence}]
 
-        for start, end, phrase in special_matches:
-            for std_start, std_end, _ in standard_matches:
-                if abs(start - std_start) < 500:
-                    result = phrase
-                    page_num = find_page_number(full_text, sentence, pdf_path)
-                    sentence_words = len(sentence.split())
-                    display_sentence = summarize_text(sentence, max_words=50) if sentence_words > 100 else sentence
-                    notes.append({"page": page_num, "sentence": display_sentence})
-                    if debug_text:
-                        debug_text.append(
-                            f"Second check found special phrase '{result}' for {standard} on page {page_num} in {Path(pdf_path).name}: "
-                            f"'{sentence}'\n"
-                        )
-                    if result in ["all new build", "all new dwellings", "all new homes"]:
-                        return "100%", notes
-                    return result, notes
-
-        for p_start, p_end, numeric_percent, written_percent in percent_matches:
-            if numeric_percent:
-                percent = numeric_percent + "%"
-            elif written_percent:
-                percent = NUMBER_WORDS.get(written_percent.lower(), "Unknown") + "%"
-            else:
-                continue
+    if (all_new_homes & (phrases.sentences == sentence_index)).any():
+        if debug_text:
+            debug_text.append(
+                f"Second check found 'all new homes' for {standard} on page {page_num} in {Path(pdf_path).name}: "
+                f"'{sentence}' -> 100%\n"
+            )
+        return "100%", notes
 
-            min_distance = float('inf')
-            is_standard = False
-            for std_start, std_end, _ in standard_matches:
-                distance = min(abs(p_start - std_end), abs(p_end - std_start))
-                if distance < min_distance:
-                    min_distance = distance
-                    is_standard = True
-            for opp_start, opp_end, _ in opposite_matches:
-                distance = min(abs(p_start - opp_end), abs(p_end - opp_start))
-                if distance < min_distance:
-                    min_distance = distance
-                    is_standard = False
-
-            if is_standard and min_distance < 100:
-                result = percent
-                page_num = find_page_number(full_text, sentence, pdf_path)
-                sentence_words = len(sentence.split())
-                display_sentence = summarize_text(sentence, max_words=50) if sentence_words > 100 else sentence
-                notes.append({"page": page_num, "sentence": display_sentence})
-                if debug_text:
-                    debug_text.append(
-                        f"Second check found {standard} with percentage {percent} on page {page_num} in {Path(pdf_path).name}: "
-                        f"'{sentence}'\n"
-                    )
-                return result, notes
+    phrase_hits = np.flatnonzero(near_phrases & (phrases.sentences == sentence_index))
+    if phrase_hits.size:
+        token = scores.tokens[phrases.indices[phrase_hits[0]]]
+        result = full_text[token.start:token.end]
+        if debug_text:
+            debug_text.append(
+                f"Second check found special phrase '{result}' for {standard} on page {page_num} in {Path(pdf_path).name}: "
+                f"'{sentence}'\n"
+            )
+        if result in ["all new build", "all new dwellings", "all new homes"]:
+            return "100%", notes
+        return result, notes
 
+    percent_hit = np.flatnonzero(near_percents & (percents.sentences == sentence_index))[0]
+    result = percent_value(scores.tokens[percents.indices[percent_hit]])
     if debug_text:
-        debug_text.append(f"Second check: No valid result found for {standard} in {Path(pdf_path).name}\n")
+        debug_text.append(
+            f"Second check found {standard} with percentage {result} on page {page_num} in {Path(pdf_path).name}: "
+            f"'{sentence}'\n"
+        )
     return result, notes
 
-def third_check_percentage(standard, full_text, pdf_path, debug_text=None):
+def third_check_percentage(standard, document, debug_text=None):
     """Third check for percentages near M4(2) or M4(3) keywords."""
-    standard_pattern = re.compile(
-        r"M4\s*\(?\s*2\s*\)?|Category\s*2\s*(?:Accessible\s*and\s*Adaptable)?",
-        re.IGNORECASE
-    ) if standard == "M4(2)" else re.compile(
-        r"M4\s*\(?\s*3\s*\)?|Category\s*3\s*(?:Wheelchair\s*User\s*Dwellings)?",
-        re.IGNORECASE
-    )
-    percent_pattern = re.compile(
-        r"(\d{1,3})\s*(?:%|\b(?:percent|per\s*cent)\b)(?:\s|$)|"
-        r"(?:\b(ninety|ten|one\s*hundred)\s*(?:percent|per\s*cent)\b)",
-        re.IGNORECASE
-    )
-
-    sentences = [s.strip() for s in full_text.split(".") if s.strip()]
+    pdf_path = document.pdf_path
+    scores = document.proximity_scores()
+    mentions, percents, nearest, _ = scores.mention_percents[standard]
     standard_percentages = []
     notes = []
 
-    for sentence in sentences:
-        if not re.search(standard_pattern, sentence):
-            continue
-
-        standard_matches = [(m.start(), m.group()) for m in re.finditer(standard_pattern, sentence)]
-        percent_matches = []
-        for match in percent_pattern.finditer(sentence):
-            if match.group(1):
-                percent = match.group(1) + "%"
-            elif match.group(2):
-                percent = NUMBER_WORDS.get(match.group(2).lower(), "Unknown") + "%"
-            else:
+    # Each mention takes the percentage starting nearest to it in its sentence
+    mention_sentences = zip(mentions.sentences.tolist(), nearest.tolist())
+    for sentence_index, sentence_mentions in groupby(mention_sentences, key=lambda mention: mention[0]):
+        sentence, sentence_start, sentence_end = document.sentences().sentence(sentence_index)
+        for _, percent_index in sentence_mentions:
+            if percent_index < 0:
                 continue
-            percent_matches.append((match.start(), percent))
-
-        for std_start, _ in standard_matches:
-            closest_percent = None
-            min_distance = float('inf')
-            for p_start, percent in percent_matches:
-                distance = abs(p_start - std_start)
-                if distance < min_distance:
-                    min_distance = distance
-                    closest_percent = percent
-            if closest_percent:
-                standard_percentages.append(closest_percent)
-                page_num = find_page_number(full_text, sentence, pdf_path)
-                sentence_words = len(sentence.split())
-                display_sentence = summarize_text(sentence, max_words=50) if sentence_words > 100 else sentence
-                notes.append({"page": page_num, "sentence": display_sentence})
-                if debug_text:
-                    debug_text.append(
-                        f"Third check found {standard} with percentage {closest_percent} on page {page_num} in {Path(pdf_path).name}: "
-                        f"'{sentence}'\n"
-                    )
+            closest_percent = percent_value(scores.tokens[percents.indices[percent_index]])
+            standard_percentages.append(closest_percent)
+            page_num = find_page_number(document, sentence_start, sentence_end)
+            sentence_words = len(sentence.split())
+            display_sentence = summarize_text(sentence, max_words=50) if sentence_words > 100 else sentence
+            notes.append({"page": page_num, "sentence": display_sentence})
+            if debug_text:
+                debug_text.append(
+                    f"Third check found {standard} with percentage {closest_percent} on page {page_num} in {Path(pdf_path).name}: "
+                    f"'{sentence}'\n"
+                )
 
-        if re.search(standard_pattern, sentence) and not standard_percentages:
+        if not standard_percentages:
             if debug_text:
                 debug_text.append(f"Third check found {standard} but no percentage in {Path(pdf_path).name}: '{sentence}'\n")
 
@@ -573,49 +1232,97 @@ def third_check_percentage(standard, full_text, pdf_path, debug_text=None):
 
     return percentage, notes
 
-def find_plan_period(full_text, pdf_path, debug_text=None):
+def find_plan_period(document, debug_text=None):
     """Extract plan period (e.g., 2013-2032)."""
-    pattern = re.compile(
-        r"(?:Local\s*Plan|Core\s*Strategy|housing\s*requirement|plan\s*period).{0,200}?\b(\d{4})\s*[-–—]\s*(\d{4})\b",
-        re.IGNORECASE
-    )
-    matches = pattern.finditer(full_text)
+    pdf_path = document.pdf_path
     plan_periods = []
-    for match in matches:
-        start_year, end_year = match.groups()
+    for token in document.tokens():
+        if token.kind != "plan_period":
+            continue
+        start_year, end_year = token.match.group("plan_start", "plan_end")
         period = f"{start_year}-{end_year}"
         plan_periods.append(period)
         if debug_text:
             debug_text.append(f"Found plan period: {period} in {Path(pdf_path).name}\n")
     return sorted(plan_periods)[0] if plan_periods else "Unknown"
 
+def merge_pdf_shards(pdf_path, shards, debug_text):
+    """Merge the page-range shards of a PDF into one DocumentText, the same as extracting it whole.
+
+    Returns None if any shard failed, so that the document is extracted again serially.
+    """
+    pages = []
+    ocr_pages = []
+    ocr_failed = []
+    for shard_pages, shard_ocr_pages, shard_ocr_failed, shard_debug in shards:
+        debug_text.extend(shard_debug)
+        if shard_pages is None:
+            debug_text.append(f"A page-range shard failed; extracting {pdf_path} in one pass\n")
+            return None
+        pages.extend(shard_pages)
+        ocr_pages.extend(shard_ocr_pages)
+        ocr_failed.extend(shard_ocr_failed)
+    debug_text.append(f"Merged {len(shards)} page-range shards of {len(pages)} pages\n")
+    return DocumentText(pdf_path, pages, "PyMuPDF", ocr_pages, ocr_failed)
+
 def process_pdf(args):
-    """Process a single PDF to extract metadata and standards."""
-    pdf_path, output_dir = args
+    """Process a single PDF to extract metadata and standards.
+
+    args is (pdf_path, output_dir), optionally followed by the extract_pdf_shard results for
+    consecutive page ranges of the document, which are merged instead of extracting it again.
+    """
+    pdf_path, output_dir = args[:2]
+    shards = args[2] if len(args) > 2 else None
     debug_text = [f"Starting processing for {pdf_path}\n"]
+    imported = set(IMPORT_SECONDS)
     try:
-        results, full_text, search_debug = search_pdf_for_standards(pdf_path, output_dir)
-        debug_text.extend(search_debug)
-        if results is None:
-            debug_text.append(f"Failed to process {pdf_path}: No results returned from search_pdf_for_standards.\n")
+        # Unchanged PDFs are served from the result cache without reprocessing
+        content_hash = file_sha256(pdf_path)
+        cache_key = result_cache_key(content_hash)
+        cached = result_cache.get(cache_key)
+        if cached:
+            json_file = output_dir / f"summary_{Path(pdf_path).stem}.json"
+            with open(json_file, "w") as f:
+                json.dump(cached["summary"], f, indent=2)
+            csv_data = dict(cached["csv_data"], **{"Local Planning Authority": Path(pdf_path).stem})
+            debug_text.append(f"Loaded cached result for {pdf_path} (key {cache_key})\n")
+            return csv_data, debug_text
+
+        document = merge_pdf_shards(pdf_path, shards, debug_text) if shards else None
+        if document is None:
+            document = extract_document_text(pdf_path, debug_text, content_hash)
+        if document is None:
+            debug_text.append(f"Failed to process {pdf_path}: No text could be extracted.\n")
             return None, debug_text
+        summarizer.start_document()
 
-        authority_name, doc_date, pdf_url = extract_metadata(pdf_path, output_dir)
+        results, search_debug = search_pdf_for_standards(document, output_dir)
+        debug_text.extend(search_debug)
+
+        authority_name, doc_date, pdf_url = extract_metadata(document, output_dir)
         debug_text.append(f"Metadata extracted: Authority={authority_name}, Date={doc_date}\n")
 
-        plan_period = find_plan_period(full_text, pdf_path, debug_text)
-        m4_2_percent, m4_2_notes = find_percentage_in_context("M4(2)", full_text, pdf_path, debug_text)
-        m4_3_percent, m4_3_notes = find_percentage_in_context("M4(3)", full_text, pdf_path, debug_text)
+        plan_period = find_plan_period(document, debug_text)
+        m4_2_percent, m4_2_notes = find_percentage_in_context("M4(2)", document, debug_text)
+        m4_3_percent, m4_3_notes = find_percentage_in_context("M4(3)", document, debug_text)
 
         if m4_2_percent == "N/A":
-            m4_2_percent, m4_2_notes = second_check_percentage("M4(2)", full_text, pdf_path, debug_text)
+            m4_2_percent, m4_2_notes = second_check_percentage("M4(2)", document, debug_text)
         if m4_3_percent == "N/A":
-            m4_3_percent, m4_3_notes = second_check_percentage("M4(3)", full_text, pdf_path, debug_text)
+            m4_3_percent, m4_3_notes = second_check_percentage("M4(3)", document, debug_text)
 
         if m4_2_percent == "N/A":
-            m4_2_percent, m4_2_notes = third_check_percentage("M4(2)", full_text, pdf_path, debug_text)
+            m4_2_percent, m4_2_notes = third_check_percentage("M4(2)", document, debug_text)
         if m4_3_percent == "N/A":
-            m4_3_percent, m4_3_notes = third_check_percentage("M4(3)", full_text, pdf_path, debug_text)
+            m4_3_percent, m4_3_notes = third_check_percentage("M4(3)", document, debug_text)
+        if any(summarizer.counts.values()):
+            debug_text.append(
+                "Summaries: " + ", ".join(f"{count} {how}" for how, count in summarizer.counts.items())
+                + f" ({summarizer.spent:.2f}s in LexRank)\n"
+            )
+        new_imports = [f"{name} ({seconds:.2f}s)" for name, seconds in IMPORT_SECONDS.items() if name not in imported]
+        if new_imports:
+            debug_text.append(f"Imported {', '.join(new_imports)}\n")
 
         # Format notes with text wrapping
         def wrap_text(text, width=60):
@@ -656,7 +1363,7 @@ def process_pdf(args):
         for standard in ["M4(2)", "M4(3)"]:
             if results[standard]:
                 summary["standards_found"].append(standard)
-                summary["details"][standard] = [{"page": r["page"], "context": r["context"]} for r in results[standard]]
+                summary["details"][standard] = match_contexts(document, results[standard])
 
         json_file = output_dir / f"summary_{Path(pdf_path).stem}.json"
         with open(json_file, "w") as f:
@@ -675,11 +1382,283 @@ def process_pdf(args):
             f"Processed {pdf_path}: Plan Period={plan_period}, "
             f"M4(2)={m4_2_percent}, M4(3)={m4_3_percent}, Notes={notes_str}\n"
         )
+        # Results with pages whose OCR failed, or with summaries that fell back to leading words, are
+        # not cached, so a re-run can replace them
+        if document.ocr_failed:
+            debug_text.append(
+                f"Not caching the result: OCR failed on {len(document.ocr_failed)} pages\n"
+            )
+        elif summarizer.fell_back:
+            debug_text.append("Not caching the result: some summaries used leading words instead of LexRank\n")
+        else:
+            result_cache.put(cache_key, {
+                "csv_data": csv_data,
+                "summary": summary,
+                "method": document.method,
+                "pages": document.pages,
+            })
         return csv_data, debug_text
     except Exception as e:
         debug_text.append(f"Error processing {pdf_path}: {str(e)}\n")
         return None, debug_text
 
+# Pre-triage: the processing time of each PDF is estimated from its metadata alone, so that the
+# longest documents start first and the run has a realistic ETA. The per-page costs are rough
+# timings for a page with a text layer and a page that needs OCR; the share of pages with a text
+# layer is estimated from the fonts of TRIAGE_SAMPLE_PAGES evenly spaced pages.
+TRIAGE_DOCUMENT_SECONDS = 0.2
+TRIAGE_TEXT_PAGE_SECONDS = float(os.environ.get("LPA_TRIAGE_TEXT_PAGE_SECONDS", "0.01"))
+TRIAGE_OCR_PAGE_SECONDS = float(os.environ.get("LPA_TRIAGE_OCR_PAGE_SECONDS", "2"))
+TRIAGE_SAMPLE_PAGES = 5
+
+def triage_pdf(pdf_path):
+    """Read a PDF's file size, page count, encryption and text-layer share without extracting any
+    text, and estimate its processing time ("cost", in seconds) from them."""
+    triage = {"bytes": Path(pdf_path).stat().st_size, "pages": 0, "encrypted": False, "text_share": 1.0}
+    try:
+        fitz = lazy_import("fitz")
+        with fitz.open(pdf_path) as pdf:
+            triage["pages"] = pdf.page_count
+            triage["encrypted"] = bool(pdf.needs_pass)
+            if pdf.page_count and not pdf.needs_pass:
+                last = pdf.page_count - 1
+                sample = {round(i * last / (TRIAGE_SAMPLE_PAGES - 1)) for i in range(TRIAGE_SAMPLE_PAGES)}
+                triage["text_share"] = sum(1 for page_num in sample if pdf.get_page_fonts(page_num)) / len(sample)
+    except Exception as e:
+        triage["error"] = str(e)
+    page_seconds = (
+        triage["text_share"] * TRIAGE_TEXT_PAGE_SECONDS + (1 - triage["text_share"]) * TRIAGE_OCR_PAGE_SECONDS
+    )
+    triage["cost"] = TRIAGE_DOCUMENT_SECONDS + triage["pages"] * page_seconds
+    return triage
+
+def estimate_run_seconds(costs, workers):
+    """Run time for documents of the given costs started longest first, each on the first free worker."""
+    loads = [0.0] * workers
+    for cost in sorted(costs, reverse=True):
+        heapq.heapreplace(loads, loads[0] + cost)
+    return max(loads)
+
+def format_duration(seconds):
+    """Seconds as e.g. "1h 05m", "4m 09s" or "12s"."""
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    return f"{minutes}m {seconds:02d}s" if minutes else f"{seconds}s"
+
+# Documents of at least LPA_SHARD_MIN_PAGES pages are split into page ranges of LPA_SHARD_PAGES pages
+# (never fewer than the date pages), which are extracted and OCR'd by separate workers and then merged
+SHARD_MIN_PAGES = int(os.environ.get("LPA_SHARD_MIN_PAGES", "400"))
+SHARD_PAGES = max(int(os.environ.get("LPA_SHARD_PAGES", "100")), DATE_SEARCH_PAGES)
+
+def shard_ranges(page_count):
+    """Split a document of page_count pages into (first_page, last_page) shards, or [] if it is too small."""
+    if page_count < SHARD_MIN_PAGES:
+        return []
+    return [
+        (first_page, min(first_page + SHARD_PAGES - 1, page_count))
+        for first_page in range(1, page_count + 1, SHARD_PAGES)
+    ]
+
+# Each document (or shard) task is stopped after max(LPA_TASK_TIMEOUT_SECONDS, LPA_TASK_TIMEOUT_MULTIPLE
+# times its triage estimate) seconds, or when its worker and the worker's Tesseract processes use more
+# than LPA_WORKER_MAX_RSS_MB of memory (needs psutil). Workers are replaced after LPA_WORKER_MAX_TASKS
+# tasks to release memory that builds up across documents. 0 disables each limit.
+TASK_TIMEOUT_SECONDS = float(os.environ.get("LPA_TASK_TIMEOUT_SECONDS", "600"))
+TASK_TIMEOUT_MULTIPLE = float(os.environ.get("LPA_TASK_TIMEOUT_MULTIPLE", "10"))
+WORKER_MAX_RSS_BYTES = int(os.environ.get("LPA_WORKER_MAX_RSS_MB", "2048")) * 1024 * 1024
+WORKER_MAX_TASKS = int(os.environ.get("LPA_WORKER_MAX_TASKS", "50"))
+SUPERVISOR_POLL_SECONDS = 1.0
+WORKER_STOP_SECONDS = 5.0  # grace after SIGTERM before a worker is killed outright
+# Workers are started by a fork server (or spawned where there is none) rather than forked from the
+# main process, which runs tqdm's monitor thread, so they never inherit a lock held by another thread
+WORKER_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+def task_timeout(estimated_seconds):
+    """Wall-clock limit in seconds for a task estimated to take estimated_seconds, or None for no limit."""
+    if TASK_TIMEOUT_SECONDS <= 0:
+        return None
+    return max(TASK_TIMEOUT_SECONDS, TASK_TIMEOUT_MULTIPLE * estimated_seconds)
+
+def process_tree_rss(pid):
+    """Resident memory in bytes of process pid and its descendants."""
+    psutil = lazy_import("psutil")
+    try:
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+    except psutil.Error:
+        return 0
+    rss = 0
+    for process in processes:
+        try:
+            rss += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return rss
+
+def supervised_worker(connection, slots, held):
+    """Worker loop of SupervisedPool: run (function, args) tasks from connection until None is sent.
+
+    Each task's result is sent back as (result, None), or (None, error) if it raised.
+    """
+    init_ocr_worker(slots, held)
+    signal.signal(signal.SIGTERM, stop_worker)
+    for function, args in iter(connection.recv, None):
+        try:
+            reply = (function(args), None)
+        except Exception as e:
+            reply = (None, f"failed: {type(e).__name__}: {e}")
+        connection.send(reply)
+
+class SupervisedPool:
+    """Worker processes that run one task at a time under the supervision of the main process.
+
+    Unlike multiprocessing.Pool, a task that runs past its timeout or whose worker exceeds
+    WORKER_MAX_RSS_BYTES is stopped by killing the worker (and its Tesseract processes), and a worker
+    that crashes or is killed is replaced, so one bad document cannot stall the batch. Each worker has
+    its own pipe, so killing one cannot corrupt another's results.
+    """
+
+    def __init__(self, processes, slots):
+        self.slots = slots
+        self.max_rss = WORKER_MAX_RSS_BYTES
+        if self.max_rss:
+            try:
+                lazy_import("psutil")
+            except ImportError:
+                print("psutil is not installed; worker memory limits are disabled")
+                self.max_rss = 0
+        self.next_rss_check = 0.0
+        self.workers = [self.start_worker() for _ in range(processes)]
+
+    def start_worker(self):
+        """Start a worker, returned as a dict of its process, pipe, current task and tasks run."""
+        connection, worker_connection = WORKER_CONTEXT.Pipe()
+        held = WORKER_CONTEXT.RawValue("b", 0)
+        process = WORKER_CONTEXT.Process(
+            target=supervised_worker, args=(worker_connection, self.slots, held), daemon=True
+        )
+        process.start()
+        worker_connection.close()
+        return {"process": process, "connection": connection, "held": held, "task": None, "tasks_run": 0}
+
+    def submit(self, task_id, function, args, timeout=None):
+        """Run function(args) on an idle worker, stopping it after timeout seconds if given.
+
+        The caller must not submit more tasks than there are workers before collecting results.
+        """
+        worker = next(worker for worker in self.workers if worker["task"] is None)
+        worker["task"] = (task_id, timeout, time.time() + timeout if timeout else None)
+        worker["connection"].send((function, args))
+
+    def replace_worker(self, worker, kill):
+        """Stop worker (stopping it and its child processes at once if kill) and start a new one in its place."""
+        process = worker["process"]
+        if kill and process.is_alive():
+            try:
+                psutil = lazy_import("psutil")
+                children = psutil.Process(process.pid).children(recursive=True)
+            except Exception:
+                children = []
+            # SIGTERM lets stop_worker finish taking or returning an OCR slot first
+            process.terminate()
+            process.join(WORKER_STOP_SECONDS)
+            if process.is_alive():
+                process.kill()
+            for child in children:
+                try:
+                    child.kill()
+                except Exception:
+                    pass
+        elif process.is_alive():
+            worker["connection"].send(None)
+        process.join()
+        worker["connection"].close()
+        if worker["held"].value:
+            self.slots.release()
+        self.workers[self.workers.index(worker)] = self.start_worker()
+
+    def next_result(self):
+        """Wait for the next task to finish and return (task_id, result, error).
+
+        error is None on success, or a "<kind>: <detail>" string: kind is "failed" if the task
+        raised, "timeout" or "memory" if it was stopped, and "crashed" if its worker died.
+        """
+        while True:
+            busy = [worker for worker in self.workers if worker["task"] is not None]
+            ready = multiprocessing.connection.wait(
+                [worker["connection"] for worker in busy], timeout=SUPERVISOR_POLL_SECONDS
+            )
+            # Limits are checked on every pass, before any results; memory is measured at most once
+            # per poll interval because listing each worker's process tree is comparatively slow
+            now = time.time()
+            check_rss = self.max_rss and now >= self.next_rss_check
+            if check_rss:
+                self.next_rss_check = now + SUPERVISOR_POLL_SECONDS
+            for worker in busy:
+                task_id, timeout, deadline = worker["task"]
+                error = None
+                if deadline is not None and now > deadline:
+                    error = f"timeout: stopped after {timeout:.0f}s"
+                elif check_rss:
+                    rss = process_tree_rss(worker["process"].pid)
+                    if rss > self.max_rss:
+                        error = f"memory: stopped using {rss / 1024 / 1024:.0f} MB"
+                if error:
+                    self.replace_worker(worker, kill=True)
+                    return task_id, None, error
+            for worker in busy:
+                if worker["connection"] not in ready:
+                    continue
+                task_id = worker["task"][0]
+                try:
+                    result, error = worker["connection"].recv()
+                except (EOFError, OSError):
+                    worker["process"].join()
+                    error = f"crashed: worker exited with code {worker['process'].exitcode}"
+                    self.replace_worker(worker, kill=True)
+                    return task_id, None, error
+                worker["task"] = None
+                worker["tasks_run"] += 1
+                if WORKER_MAX_TASKS and worker["tasks_run"] >= WORKER_MAX_TASKS:
+                    self.replace_worker(worker, kill=False)
+                return task_id, result, error
+
+    def close(self):
+        """Stop every worker, killing any that are busy rather than waiting for their tasks."""
+        for worker in self.workers:
+            process = worker["process"]
+            if worker["task"] is not None:
+                process.kill()
+            elif process.is_alive():
+                try:
+                    worker["connection"].send(None)
+                except OSError:
+                    process.kill()
+            process.join()
+            worker["connection"].close()
+        self.workers = []
+
+def failure_row(pdf_path, error):
+    """CSV row reporting that pdf_path was not processed, with error as "<kind>: <detail>"."""
+    return {
+        "Local Planning Authority": Path(pdf_path).stem,
+        "Date of Doc/Status": "N/A",
+        "Plan Period": "N/A",
+        "M4(2) Percentage": "N/A",
+        "M4(3) Percentage": "N/A",
+        "Notes": "",
+        "Error": error
+    }
+
+def process_triaged_pdf(args):
+    """Process a PDF scheduled by main, returning its path with the process_pdf result."""
+    csv_data, debug_text = process_pdf(args)
+    return args[0], csv_data, debug_text
+
 def main():
     """Main function to process PDFs in a directory."""
     directory = input("Enter the directory path containing PDF files (e.g., ~/Desktop/Yorkshire): ")
@@ -698,24 +1677,129 @@ def main():
     csv_file = directory_path / "summary_output.csv"
     error_log_file = directory_path / "error_log.txt"
     error_log = []
+    all_csv_data = []
     processed_count = 0
 
     num_processes = min(multiprocessing.cpu_count(), 16)
-    pool = multiprocessing.Pool(processes=num_processes)
-    tasks = [(pdf_path, output_dir) for pdf_path in pdf_files]
 
-    all_csv_data = []
-    for result in tqdm(pool.imap_unordered(process_pdf, tasks), total=len(tasks), desc="Processing PDFs"):
-        csv_data, debug_text = result
-        if csv_data:
-            all_csv_data.append(csv_data)
-            debug_text.append(f"Added to CSV: {csv_data['Local Planning Authority']}\n")
+    # Triage every PDF, then schedule the longest expected first so that no long document starts last
+    triages = {}
+    for pdf_path in pdf_files:
+        triage = triage_pdf(pdf_path)
+        if triage["encrypted"]:
+            error = "encrypted: the PDF is password-protected"
+            error_log.append(f"Error: {pdf_path}: {error}\n")
+            all_csv_data.append(failure_row(pdf_path, error))
+            continue
+        triages[pdf_path] = triage
+    scheduled = sorted(triages, key=lambda pdf_path: triages[pdf_path]["cost"], reverse=True)
+
+    # Large documents not already in the result cache are sharded by page range when there are
+    # workers to share them; process_pdf merges the shards into the same text as a serial run
+    shard_tasks = {}
+    for pdf_path in scheduled:
+        triage = triages[pdf_path]
+        ranges = shard_ranges(triage["pages"]) if num_processes > 1 and "error" not in triage else []
+        if len(ranges) > 1:
+            content_hash = file_sha256(pdf_path)
+            if result_cache.get(result_cache_key(content_hash)) is None:
+                shard_tasks[pdf_path] = [
+                    (pdf_path, first_page, last_page, content_hash) for first_page, last_page in ranges
+                ]
+    task_costs = []
+    for pdf_path, triage in triages.items():
+        if pdf_path in shard_tasks:
+            task_costs.extend(
+                triage["cost"] * (last_page - first_page + 1) / triage["pages"]
+                for _, first_page, last_page, _ in shard_tasks[pdf_path]
+            )
         else:
-            debug_text.append(f"Skipped writing to CSV: No csv_data returned\n")
-        error_log.extend(debug_text)
+            task_costs.append(triage["cost"])
+
+    total_cost = sum(triage["cost"] for triage in triages.values())
+    total_pages = sum(triage["pages"] for triage in triages.values())
+    ocr_pages = sum(triage["pages"] * (1 - triage["text_share"]) for triage in triages.values())
+    run_estimate = estimate_run_seconds(task_costs, num_processes)
+    print(
+        f"Triage: {len(triages)} PDFs, {total_pages} pages ({ocr_pages:.0f} likely to need OCR, "
+        f"{len(shard_tasks)} PDFs sharded); estimated run time {format_duration(run_estimate)} on "
+        f"{num_processes} workers"
+    )
+
+    started = time.time()
+    ocr_slots = WORKER_CONTEXT.BoundedSemaphore(OCR_WORKERS)
+    pool = SupervisedPool(num_processes, ocr_slots)
 
-    pool.close()
-    pool.join()
+    # Tasks are (pdf_path, shard index or None, function, args). No more are submitted than there are
+    # workers, so that the merge of a sharded document goes ahead of the queue once its shards are done
+    pending = deque()
+    for pdf_path in scheduled:
+        if pdf_path in shard_tasks:
+            pending.extend(
+                (pdf_path, index, extract_pdf_shard, shard_args)
+                for index, shard_args in enumerate(shard_tasks[pdf_path])
+            )
+        else:
+            pending.append((pdf_path, None, process_triaged_pdf, (pdf_path, output_dir)))
+    shard_results = {pdf_path: [None] * len(tasks) for pdf_path, tasks in shard_tasks.items()}
+    in_flight = 0
+
+    # Progress is measured in estimated seconds of work, so the ETA allows for the documents left;
+    # sharded documents are counted as their shards finish, and updates are clamped to the total
+    # because the costs are added up in a different order
+    try:
+        with tqdm(total=total_cost, desc="Processing PDFs", unit="s", unit_scale=True) as progress:
+            while pending or in_flight:
+                while pending and in_flight < num_processes:
+                    task = pending.popleft()
+                    pdf_path, shard_index, function, args = task
+                    triage = triages[pdf_path]
+                    task_estimate = triage["cost"]
+                    if shard_index is not None:
+                        task_estimate *= (args[2] - args[1] + 1) / triage["pages"]
+                    pool.submit(task, function, args, task_timeout(task_estimate))
+                    in_flight += 1
+                (pdf_path, shard_index, _, args), result, error = pool.next_result()
+                in_flight -= 1
+                triage = triages[pdf_path]
+
+                if shard_index is not None:
+                    _, first_page, last_page, _ = args
+                    if error is not None:
+                        result = (None, [], [], [f"Error: pages {first_page}-{last_page}: {error}\n"])
+                    shards = shard_results[pdf_path]
+                    shards[shard_index] = result
+                    share = triage["cost"] * (last_page - first_page + 1) / triage["pages"]
+                    progress.update(min(share, progress.total - progress.n))
+                    if all(shard is not None for shard in shards):
+                        pending.appendleft((pdf_path, None, process_triaged_pdf, (pdf_path, output_dir, shards)))
+                    continue
+
+                # Documents that fail, or are stopped by the supervisor, get a CSV row saying why
+                if error is not None:
+                    csv_data, debug_text = None, [f"Starting processing for {pdf_path}\n", f"Error: {pdf_path}: {error}\n"]
+                else:
+                    _, csv_data, debug_text = result
+                    if not csv_data:
+                        error = f"failed: {debug_text[-1].strip()}"
+                debug_text.insert(1, (
+                    f"Triage: {triage['pages']} pages, {triage['bytes'] / 1e6:.1f} MB, text layer on "
+                    f"{triage['text_share']:.0%} of sampled pages, estimated {triage['cost']:.1f}s\n"
+                ))
+                if "error" in triage:
+                    debug_text.insert(2, f"Triage could not read the PDF: {triage['error']}\n")
+                if csv_data:
+                    all_csv_data.append(csv_data)
+                    debug_text.append(f"Added to CSV: {csv_data['Local Planning Authority']}\n")
+                else:
+                    all_csv_data.append(failure_row(pdf_path, error))
+                    debug_text.append(f"Added to CSV as failed: {error}\n")
+                error_log.extend(debug_text)
+                if pdf_path not in shard_results:
+                    progress.update(min(triage["cost"], progress.total - progress.n))
+    finally:
+        # Busy workers are killed if the run is interrupted
+        pool.close()
 
     all_csv_data.sort(key=lambda x: x["Local Planning Authority"].lower())
 
@@ -726,20 +1810,23 @@ def main():
             "Plan Period",
             "M4(2) Percentage",
             "M4(3) Percentage",
-            "Notes"
+            "Notes",
+            "Error"
         ]
         writer = csv.DictWriter(f, fieldnames=fieldnames)
         writer.writeheader()
         for csv_data in all_csv_data:
             writer.writerow(csv_data)
-            processed_count += 1
+            if "Error" not in csv_data:
+                processed_count += 1
 
     if error_log:
         with open(error_log_file, "w", encoding="utf-8") as f:
             f.write("\n".join(error_log))
         print(f"Errors logged to {error_log_file}")
 
-    print(f"\nProcessed {processed_count}/{len(pdf_files)} PDFs. CSV saved to {csv_file}")
+    print(f"\nProcessed {processed_count}/{len(pdf_files)} PDFs ({len(all_csv_data) - processed_count} failed) in "
+          f"{format_duration(time.time() - started)} (estimated {format_duration(run_estimate)}). CSV saved to {csv_file}")
     print(f"Text and JSON files saved to {output_dir}")
 
 if __name__ == "__main__":
@@ -1,37 +1,101 @@
-from flask import Flask, request, send_file, render_template, jsonify
+from flask import Flask, Request, request, send_file, render_template, jsonify, Response
 import tempfile
 import shutil
 from pathlib import Path
 import zipfile
 import os
+import io
+import mmap
 import re
-import fitz  # PyMuPDF
-import PyPDF2
+import bisect
+import hashlib
+import sqlite3
+import time
+import zlib
+from collections import OrderedDict, deque, namedtuple
+from contextlib import closing
 from datetime import datetime
 import json
 import csv
+import sys
+import importlib
 from tqdm import tqdm
 import multiprocessing
-import pytesseract
-from pdf2image import convert_from_path
-from PIL import Image
-import PIL.ImageEnhance
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers.lex_rank import LexRankSummarizer
-import nltk
+import multiprocessing.connection
 import threading
+import queue
+import uuid
 
-# Initialize NLTK data
-try:
-    nltk.download('punkt', quiet=True)
-    nltk.download('punkt_tab', quiet=True)
-except Exception as e:
-    print(f"Failed to download NLTK tokenizers: {e}")
+# Heavy dependencies (PyMuPDF, PyPDF2, sumy and NLTK) are imported by lazy_import when a stage first
+# needs them, so that the server and its workers start quickly; IMPORT_SECONDS records what each
+# import cost in this process
+IMPORT_SECONDS = {}
 
-# Global variables for progress tracking
-progress = {"total": 0, "current": 0, "message": "Processing..."}
+def lazy_import(name):
+    module = sys.modules.get(name)
+    if module is None:
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        IMPORT_SECONDS[name] = time.perf_counter() - started
+    return module
+
+# NLTK sentence tokenizer data used by the summariser, either of which will do. It is looked up
+# locally (including in $NLTK_DATA) and never downloaded; without it summaries use leading words.
+NLTK_TOKENIZERS = ["tokenizers/punkt_tab", "tokenizers/punkt"]
+
+def nltk_data_available():
+    nltk = lazy_import("nltk")
+    for resource in NLTK_TOKENIZERS:
+        try:
+            nltk.data.find(resource)
+            return True
+        except LookupError:
+            pass
+    return False
+
+# Progress state for each job, keyed by job ID
+job_progress = {}
 progress_lock = threading.Lock()
+# Notified (with progress_version bumped) on every progress or job status change, to wake SSE streams
+progress_changed = threading.Condition(progress_lock)
+progress_version = 0
+SSE_KEEPALIVE_SECONDS = 15
+
+# Set in pool worker processes to the worker's pipe; carries page-level progress events back to the job runner
+progress_events = None
+
+# Number of worker processes used to process an upload
+WEB_WORKERS = int(os.environ.get("LPA_WEB_WORKERS", min(multiprocessing.cpu_count(), 16)))
+# Each document is stopped after LPA_TASK_TIMEOUT_SECONDS, or when its worker uses more than
+# LPA_WORKER_MAX_RSS_MB of memory (needs psutil); workers are replaced after LPA_WORKER_MAX_TASKS
+# documents. 0 disables each limit.
+TASK_TIMEOUT_SECONDS = float(os.environ.get("LPA_TASK_TIMEOUT_SECONDS", "600"))
+WORKER_MAX_RSS_BYTES = int(os.environ.get("LPA_WORKER_MAX_RSS_MB", "2048")) * 1024 * 1024
+WORKER_MAX_TASKS = int(os.environ.get("LPA_WORKER_MAX_TASKS", "50"))
+SUPERVISOR_POLL_SECONDS = 1.0
+# Workers are started by a fork server (or spawned where there is none) rather than forked from a
+# job runner, so they never inherit a lock that a Flask request thread happened to be holding
+WORKER_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# Background jobs: uploads are queued, processed by runner threads and their results kept on disk
+JOBS_DIR = Path(os.environ.get("LPA_JOBS_DIR", Path.home() / ".cache" / "lpa_pdf_analysis" / "jobs")).expanduser()
+JOB_RETENTION_SECONDS = float(os.environ.get("LPA_JOB_RETENTION_HOURS", "24")) * 3600
+JOB_RUNNERS = int(os.environ.get("LPA_JOB_RUNNERS", "1"))
+ZIP_STORE_MAX_BYTES = 64 * 1024
+# Uploads up to this total size are held in memory and handed to the workers without touching disk
+UPLOAD_MEMORY_MAX_BYTES = int(os.environ.get("LPA_UPLOAD_MEMORY_MAX_MB", "256")) * 1024 * 1024
+jobs = {}
+jobs_lock = threading.Lock()
+# PDF bytes of in-memory uploads for jobs that have not run yet, keyed by job ID then file name.
+# job_upload_bytes counts the bytes held for queued and running jobs; once it would pass
+# UPLOAD_MEMORY_MAX_BYTES, further uploads are written to their job's directory instead.
+job_uploads = {}
+job_upload_bytes = 0
+job_queue = queue.Queue()
+job_runners = []
+jobs_loaded = False
 
 # Dictionary for number words to percentages
 NUMBER_WORDS = {
@@ -54,111 +118,362 @@ MONTH_MAP = {
     'december': 'December'
 }
 
+MONTH_NAMES = r"(?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)"
+
+# Patterns the analysis looks for, as (token kind, pattern). Each pattern is matched exactly as it
+# would be on its own; group names are prefixed with their kind.
+TOKEN_PATTERNS = [
+    ("m4_2", r"M4\s*\(?\s*2\s*\)?|Category\s*2\s*(?:Accessible\s*and\s*Adaptable)?"),
+    ("m4_3", r"M4\s*\(?\s*3\s*\)?|Category\s*3\s*(?:Wheelchair\s*User\s*Dwellings)?"),
+    ("pct",
+     r"(?P<pct_digits>\d{1,3})\s*(?:%|\b(?:percent|per\s*cent)\b)|"
+     r"(?:\b(?P<pct_word>ninety|ten|one\s*hundred)\s*(?:percent|per\s*cent)\b)"),
+    ("plan_period",
+     r"(?:Local\s*Plan|Core\s*Strategy|housing\s*requirement|plan\s*period).{0,200}?"
+     r"\b(?P<plan_start>\d{4})\s*[-–—]\s*(?P<plan_end>\d{4})\b"),
+]
+# Dates are only looked for on the first pages, so they have a scanner of their own
+DATE_PATTERNS = [
+    ("adopted",
+     r"\b[Aa]dopted(?:\s*(?:by|on|\())?\s*(?:(?:(?P<adopted_day>\d{1,2})\s+)?"
+     r"(?P<adopted_month>" + MONTH_NAMES + r")\s*)?(?P<adopted_year>\d{4})\b(?:\))?"),
+    ("proposed",
+     r"\b(?:[Pp]roposed|[Pp]roposal|[Dd]raft)\b(?:\s*(?:in|on))?(?:[^0-9]*?)(?:(?P<proposed_day>\d{1,2})\s+)?"
+     r"(?P<proposed_month>" + MONTH_NAMES + r")\s*(?P<proposed_year>\d{4})\b"),
+    ("date", r"\b(?:(?P<date_day>\d{1,2})\s+)?(?P<date_month>" + MONTH_NAMES + r")\s*(?P<date_year>\d{4})\b"),
+]
+
+# One regex that tries every pattern at each position; starts must match the first characters of
+# every possible token, so that all other positions are skipped cheaply
+def build_scanner(patterns, starts):
+    alternatives = "|".join(f"(?P<{kind}>{pattern})" for kind, pattern in patterns)
+    return re.compile(f"(?={starts})(?={alternatives})", re.IGNORECASE)
+
+TOKEN_SCANNER = build_scanner(TOKEN_PATTERNS, r"\d|m4|ca|co|lo|ho|pl|te|ni|on")
+DATE_SCANNER = build_scanner(DATE_PATTERNS, r"\d|ad|pr|dr|ja|fe|ma|ap|ju|au|se|oc|no|de")
+STANDARD_KINDS = {"M4(2)": "m4_2", "M4(3)": "m4_3"}
+
+Token = namedtuple("Token", "kind start end match")
+
+# Characters that end a sentence for the percentage check
+SENTENCE_DELIMITERS = "."
+SENTENCE_BREAK = re.compile(f"[{re.escape(SENTENCE_DELIMITERS)}]")
+
+# Tokens of text in order; each kind is non-overlapping, as with finditer
+def scan_tokens(text, scanner=TOKEN_SCANNER):
+    tokens = []
+    kind_ends = {}
+    for match in scanner.finditer(text):
+        kind = match.lastgroup
+        start, end = match.span(kind)
+        if start < kind_ends.get(kind, 0):
+            continue
+        kind_ends[kind] = end
+        tokens.append(Token(kind, start, end, match))
+    return tokens
+
+def percent_value(token):
+    digits = token.match.group("pct_digits")
+    if digits:
+        return digits + "%"
+    return NUMBER_WORDS.get(token.match.group("pct_word").lower(), "Unknown") + "%"
+
+def first_token(tokens, kind):
+    return next((token for token in tokens if token.kind == kind), None)
+
+# Result cache settings. Bump EXTRACTOR_VERSION whenever a change to the extraction rules
+# alters the output, so that cached results from older rules are not reused.
+EXTRACTOR_VERSION = "2"
+CACHE_DIR = Path(os.environ.get("LPA_CACHE_DIR", Path.home() / ".cache" / "lpa_pdf_analysis")).expanduser()
+CACHE_MAX_BYTES = int(os.environ.get("LPA_CACHE_MAX_MB", "1024")) * 1024 * 1024
+
+class DiskCache:
+    def __init__(self, db_path, table, max_bytes):
+        self.db_path = Path(db_path)
+        self.table = table
+        self.max_bytes = max_bytes
+
+    def _connect(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} "
+            f"(key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        return conn
+
+    def get(self, key):
+        if self.max_bytes <= 0:
+            return None
+        try:
+            with closing(self._connect()) as conn, conn:
+                row = conn.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute(f"UPDATE {self.table} SET last_used = ? WHERE key = ?", (time.time(), key))
+            return json.loads(zlib.decompress(row[0]))
+        except Exception as e:
+            print(f"Cache read failed for {key}: {e}")
+            return None
+
+    def put(self, key, value):
+        if self.max_bytes <= 0:
+            return
+        blob = zlib.compress(json.dumps(value).encode("utf-8"))
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, blob, len(blob), time.time())
+                )
+                # Evict least recently used rows until the table fits in max_bytes
+                total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+                if total > self.max_bytes:
+                    for old_key, size in conn.execute(
+                        f"SELECT key, size FROM {self.table} ORDER BY last_used"
+                    ).fetchall():
+                        if total <= self.max_bytes:
+                            break
+                        conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (old_key,))
+                        total -= size
+        except Exception as e:
+            print(f"Cache write failed for {key}: {e}")
+
+result_cache = DiskCache(CACHE_DIR / "results.sqlite3", "web_results", CACHE_MAX_BYTES)
+
+def load_pdf_data(pdf_path, pdf_data=None):
+    # Uploads held in memory arrive as bytes; files on disk are memory-mapped instead of read,
+    # and the same buffer is used for hashing and text extraction
+    if pdf_data is not None:
+        return pdf_data
+    with open(pdf_path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        return memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+class UploadRequest(Request):
+    # Small uploads stay in memory while the uploads held for other jobs leave room. Larger ones are
+    # written once under JOBS_DIR and later moved (not copied) into their job, instead of being
+    # spooled to the system temp dir and saved again.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.spooled_uploads = []  # every file written under JOBS_DIR/incoming for this request
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and job_upload_bytes + total_content_length <= UPLOAD_MEMORY_MAX_BYTES:
+            return io.BytesIO()
+        incoming_dir = JOBS_DIR / "incoming"
+        incoming_dir.mkdir(parents=True, exist_ok=True)
+        spool = tempfile.NamedTemporaryFile(dir=incoming_dir, suffix=".upload", delete=False)
+        self.spooled_uploads.append(spool)
+        return spool
+
 app = Flask(__name__)
+app.request_class = UploadRequest
+
+# Summaries. LexRank's similarity matrix is quadratic in the number of sentences, so texts of more
+# than SUMMARY_MAX_SENTENCES sentences, and all texts once LexRank has taken SUMMARY_BUDGET_SECONDS
+# on the current document, are summarised by their leading words instead
+SUMMARY_MAX_SENTENCES = int(os.environ.get("LPA_SUMMARY_MAX_SENTENCES", "40"))
+SUMMARY_BUDGET_SECONDS = float(os.environ.get("LPA_SUMMARY_BUDGET_SECONDS", "5"))
+SUMMARY_CACHE_SIZE = 1024  # summaries memoised per process
+
+def lead_words(text, max_words):
+    words = text.split()
+    if len(words) > max_words:
+        return " ".join(words[:max_words]) + "..."
+    return text
+
+# LexRank summariser reusing one tokenizer and summariser per process, with an LRU memo of summaries
+# keyed by text hash and a per-document time budget (reset by start_document). fell_back records
+# whether a summary of the document used leading words because the budget ran out or the NLTK data
+# is missing, which depends on the machine rather than the text.
+class Summarizer:
+    def __init__(self):
+        self._available = None  # whether the NLTK data is installed, once checked
+        self._tokenizer = None
+        self._lex_rank = None
+        self._memo = OrderedDict()
+        self.start_document()
+
+    def start_document(self):
+        self.spent = 0.0
+        self.fell_back = False
+
+    # Builds the tokenizer and summariser on first use; False if the NLTK data is missing
+    def _load(self):
+        if self._available is None:
+            if not nltk_data_available():
+                print("NLTK tokenizer data not found, so summaries will use leading words. Install it with: "
+                      f"{sys.executable} -m nltk.downloader punkt_tab")
+                self._available = False
+            else:
+                self._tokenizer = lazy_import("sumy.nlp.tokenizers").Tokenizer("english")
+                self._lex_rank = lazy_import("sumy.summarizers.lex_rank").LexRankSummarizer()
+                self._available = True
+        return self._available
+
+    def summarize(self, text, max_words=50):
+        key = (hashlib.sha256(text.encode("utf-8")).digest(), max_words)
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            return self._memo[key]
+        if self.spent >= SUMMARY_BUDGET_SECONDS or not self._load():
+            self.fell_back = True
+            return lead_words(text, max_words)
+        PlaintextParser = lazy_import("sumy.parsers.plaintext").PlaintextParser
+        started = time.perf_counter()
+        try:
+            document = PlaintextParser.from_string(text, self._tokenizer).document
+            if len(document.sentences) > SUMMARY_MAX_SENTENCES:
+                return lead_words(text, max_words)
+            summary = self._lex_rank(document, sentences_count=1)
+            summary_text = lead_words(" ".join(str(sentence) for sentence in summary), max_words)
+        finally:
+            self.spent += time.perf_counter() - started
+        self._memo[key] = summary_text
+        if len(self._memo) > SUMMARY_CACHE_SIZE:
+            self._memo.popitem(last=False)
+        return summary_text
+
+summarizer = Summarizer()
 
 def summarize_text(text, max_words=50):
     try:
-        parser = PlaintextParser.from_string(text, Tokenizer("english"))
-        summarizer = LexRankSummarizer()
-        summary = summarizer(parser.document, sentences_count=1)
-        summary_text = " ".join(str(sentence) for sentence in summary)
-        words = summary_text.split()
-        if len(words) > max_words:
-            summary_text = " ".join(words[:max_words]) + "..."
-        return summary_text
+        return summarizer.summarize(text, max_words)
     except Exception as e:
+        summarizer.fell_back = True
         return f"Summary failed: {str(e)}"
 
-def extract_metadata(pdf_path, output_dir):
+class DocumentText:
+    """Page texts for a single PDF, extracted once and shared by every processing stage."""
+
+    def __init__(self, pdf_path, pages, method):
+        self.pdf_path = pdf_path
+        self.pages = pages  # pages[0] is page 1
+        self.method = method  # "PyMuPDF" or "PyPDF2"
+        # Page-boundary index: page_starts[i] is the full_text offset where page page_numbers[i] begins
+        self.page_starts = []
+        self.page_numbers = []
+        offset = 0
+        for page_num, text in enumerate(pages, start=1):
+            self.page_starts.append(offset)
+            self.page_numbers.append(page_num)
+            offset += len(text) + 1
+        self._full_text = None
+        self._tokens = None
+        self._token_starts = None
+        self._token_max_ends = None
+        self._sentences = None
+
+    # Every page followed by a space, joined on first use; pages holds the only other copy of the text
+    @property
+    def full_text(self):
+        if self._full_text is None:
+            self._full_text = " ".join(self.pages + [""])
+        return self._full_text
+
+    # The full_text span [start, end) of a page
+    def page_span(self, page_num):
+        page_start = self.page_starts[page_num - 1]
+        return page_start, page_start + len(self.pages[page_num - 1])
+
+    def tokens(self):
+        # full_text is scanned once, on first use
+        if self._tokens is None:
+            self._tokens = scan_tokens(self.full_text)
+            self._token_starts = [token.start for token in self._tokens]
+            # _token_max_ends[i] is the furthest end of tokens[:i], to spot tokens running into a page
+            self._token_max_ends = [0]
+            for token in self._tokens:
+                self._token_max_ends.append(max(self._token_max_ends[-1], token.end))
+        return self._tokens
+
+    def page_tokens(self, page_num):
+        # Tokens of one page with page offsets, taken from the full_text tokens unless a token runs
+        # across either edge of the page, which is then scanned on its own
+        text = self.pages[page_num - 1]
+        tokens = self.tokens()
+        page_start, page_end = self.page_span(page_num)
+        first = bisect.bisect_left(self._token_starts, page_start)
+        last = bisect.bisect_left(self._token_starts, page_end)
+        if self._token_max_ends[first] > page_start or self._token_max_ends[last] > page_end:
+            return scan_tokens(text)
+        return [token._replace(start=token.start - page_start, end=token.end - page_start) for token in tokens[first:last]]
+
+    def tokens_between(self, start, end):
+        # full_text tokens starting within [start, end)
+        tokens = self.tokens()
+        return tokens[bisect.bisect_left(self._token_starts, start):bisect.bisect_left(self._token_starts, end)]
+
+    def sentences(self):
+        if self._sentences is None:
+            self._sentences = SentenceIndex(self)
+        return self._sentences
+
+def extract_document_text(pdf_path, pdf_data, debug_text):
+    try:
+        fitz = lazy_import("fitz")
+        with fitz.open(stream=pdf_data, filetype="pdf") as pdf:
+            report_progress(pdf_path, "extracting", pages_total=len(pdf), pages_done=0)
+            pages = []
+            for page in pdf:
+                pages.append(page.get_text("text") or "")
+                report_progress(pdf_path, pages_done=len(pages))
+        return DocumentText(pdf_path, pages, "PyMuPDF")
+    except Exception as e:
+        debug_text.append(f"PyMuPDF failed: {e}\n")
+    try:
+        PyPDF2 = lazy_import("PyPDF2")
+        reader = PyPDF2.PdfReader(io.BytesIO(pdf_data))
+        report_progress(pdf_path, "extracting", pages_total=len(reader.pages), pages_done=0)
+        pages = []
+        for page in reader.pages:
+            pages.append(page.extract_text() or "")
+            report_progress(pdf_path, pages_done=len(pages))
+        return DocumentText(pdf_path, pages, "PyPDF2")
+    except Exception as e:
+        debug_text.append(f"PyPDF2 failed: {e}\n")
+        return None
+
+def extract_metadata(document, output_dir):
+    pdf_path = document.pdf_path
     file_name = Path(pdf_path).stem
     authority_name = file_name
     pdf_url = str(pdf_path)
     
-    adopted_pattern = re.compile(
-        r"\b[Aa]dopted(?:\s*(?:by|on|\())?\s*(?:(?:(\d{1,2})\s+)?((?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?))\s*)?(\d{4})\b(?:\))?",
-        re.IGNORECASE
-    )
-    proposed_pattern = re.compile(
-        r"\b(?:[Pp]roposed|[Pp]roposal|[Dd]raft)\b(?:\s*(?:in|on))?(?:[^0-9]*?)(?:(\d{1,2})\s+)?((?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?))\s*(\d{4})\b",
-        re.IGNORECASE
-    )
-    general_date_pattern = re.compile(
-        r"\b(?:(\d{1,2})\s+)?((?:Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?))\s*(\d{4})\b",
-        re.IGNORECASE
-    )
-
     doc_date = ""
     first_page_text = ""
     debug_text = [f"Debugging date extraction for {pdf_path}\n"]
 
-    try:
-        with fitz.open(pdf_path) as pdf:
-            for page_num, page in enumerate(pdf, start=1):
-                if page_num > 5:
-                    break
-                text = page.get_text("text") or ""
-                if page_num == 1:
-                    first_page_text = text
-                debug_text.append(f"Page {page_num} text (PyMuPDF): {text[:500]}...\n{'-'*50}\n")
-                
-                adopted_match = adopted_pattern.search(text)
-                if adopted_match:
-                    day, month, year = adopted_match.groups()
-                    month = MONTH_MAP.get(month.lower(), month) if month else ""
-                    doc_date = f"Adopted {day + ' ' if day else ''}{month + ' ' if month else ''}{year}"
-                    break
-                
-                proposed_match = proposed_pattern.search(text)
-                if proposed_match:
-                    day, month, year = proposed_match.groups()
-                    month = MONTH_MAP.get(month.lower(), month)
-                    keyword = "Proposed" if "propos" in proposed_match.group(0).lower() else "Draft"
-                    doc_date = f"{keyword} {day + ' ' if day else ''}{month} {year}"
-                if proposed_match:
-                    break
-            
-            if not doc_date and first_page_text:
-                general_match = general_date_pattern.search(first_page_text)
-                if general_match:
-                    day, month, year = general_match.groups()
-                    month = MONTH_MAP.get(month.lower(), month)
-                    doc_date = f"{day + ' ' if day else ''}{month} {year}"
+    for page_num, text in enumerate(document.pages[:5], start=1):
+        if page_num == 1:
+            first_page_text = text
+        debug_text.append(f"Page {page_num} text ({document.method}): {text[:500]}...\n{'-'*50}\n")
+        
+        page_tokens = scan_tokens(text, DATE_SCANNER)
+        adopted_match = first_token(page_tokens, "adopted")
+        if adopted_match:
+            day, month, year = adopted_match.match.group("adopted_day", "adopted_month", "adopted_year")
+            month = MONTH_MAP.get(month.lower(), month) if month else ""
+            doc_date = f"Adopted {day + ' ' if day else ''}{month + ' ' if month else ''}{year}"
+            break
+        
+        proposed_match = first_token(page_tokens, "proposed")
+        if proposed_match:
+            day, month, year = proposed_match.match.group("proposed_day", "proposed_month", "proposed_year")
+            month = MONTH_MAP.get(month.lower(), month)
+            keyword = "Proposed" if "propos" in proposed_match.match.group("proposed").lower() else "Draft"
+            doc_date = f"{keyword} {day + ' ' if day else ''}{month} {year}"
+        if proposed_match:
+            break
     
-    except Exception as e:
-        debug_text.append(f"PyMuPDF failed: {e}\n")
-        try:
-            with open(pdf_path, "rb") as file:
-                reader = PyPDF2.PdfReader(file)
-                for page_num in range(min(5, len(reader.pages))):
-                    text = reader.pages[page_num].extract_text() or ""
-                    if page_num == 0:
-                        first_page_text = text
-                    debug_text.append(f"Page {page_num + 1} text (PyPDF2): {text[:500]}...\n{'-'*50}\n")
-                    
-                    adopted_match = adopted_pattern.search(text)
-                    if adopted_match:
-                        day, month, year = adopted_match.groups()
-                        month = MONTH_MAP.get(month.lower(), month) if month else ""
-                        doc_date = f"Adopted {day + ' ' if day else ''}{month + ' ' if month else ''}{year}"
-                        break
-                    
-                    proposed_match = proposed_pattern.search(text)
-                    if proposed_match:
-                        day, month, year = proposed_match.groups()
-                        month = MONTH_MAP.get(month.lower(), month)
-                        keyword = "Proposed" if "propos" in proposed_match.group(0).lower() else "Draft"
-                        doc_date = f"{keyword} {day + ' ' if day else ''}{month} {year}"
-                    if proposed_match:
-                        break
-                
-                if not doc_date and first_page_text:
-                    general_match = general_date_pattern.search(first_page_text)
-                    if general_match:
-                        day, month, year = general_match.groups()
-                        month = MONTH_MAP.get(month.lower(), month)
-                        doc_date = f"{day + ' ' if day else ''}{month} {year}"
-        except Exception as e:
-            debug_text.append(f"PyPDF2 failed: {e}\n")
+    if not doc_date and first_page_text:
+        general_match = first_token(scan_tokens(first_page_text, DATE_SCANNER), "date")
+        if general_match:
+            day, month, year = general_match.match.group("date_day", "date_month", "date_year")
+            month = MONTH_MAP.get(month.lower(), month)
+            doc_date = f"{day + ' ' if day else ''}{month} {year}"
 
     if not doc_date:
         doc_date = "Unknown"
@@ -169,74 +484,85 @@ def extract_metadata(pdf_path, output_dir):
 
     return authority_name, doc_date, pdf_url
 
-def search_pdf_for_standards(pdf_path, output_dir):
-    patterns = {
-        "M4(2)": re.compile(r"M4\s*\(?\s*2\s*\)?|Category\s*2\s*(?:Accessible\s*and\s*Adaptable)?", re.IGNORECASE),
-        "M4(3)": re.compile(r"M4\s*\(?\s*3\s*\)?|Category\s*3\s*(?:Wheelchair\s*User\s*Dwellings)?", re.IGNORECASE),
-        "Percentage Target": re.compile(r"(\d{1,3})\s*(?:%|\b(?:percent|per\s*cent)\b)|(?:\b(ninety|ten|one\s*hundred)\s*(?:percent|per\s*cent)\b)", re.IGNORECASE),
-        "Plan Period": re.compile(r"(?:Local\s*Plan|Core\s*Strategy|housing\s*requirement|plan\s*period).{0,200}?\b(\d{4})\s*[-–—]\s*(\d{4})\b", re.IGNORECASE),
-    }
+# A search match, as the span of the matched text on its page
+Match = namedtuple("Match", "page start end kind")
 
-    results = {key: [] for key in patterns}
+def search_pdf_for_standards(document, output_dir):
+    kinds = {"M4(2)": "m4_2", "M4(3)": "m4_3", "Percentage Target": "pct", "Plan Period": "plan_period"}
+    results = {key: [] for key in kinds}
+    pdf_path = document.pdf_path
     debug_text = [f"Extracted text from {pdf_path}\n\n"]
-    full_text = ""
 
-    try:
-        with fitz.open(pdf_path) as pdf:
-            for page_num, page in enumerate(pdf, start=1):
-                text = page.get_text("text") or ""
-                debug_text.append(f"Page {page_num}:\n{text[:500]}...\n{'-'*50}\n")
-                full_text += text + " "
-                for key, pattern in patterns.items():
-                    matches = pattern.finditer(text)
-                    for match in matches:
-                        start = max(0, match.start() - 500)
-                        end = min(len(text), match.end() + 500)
-                        context = text[start:end].replace("\n", " ")
-                        results[key].append({"page": page_num, "match": match.group(), "context": context})
-    except Exception as e:
-        debug_text.append(f"PyMuPDF failed: {e}\n")
-        return None, "", debug_text
+    for page_num, text in enumerate(document.pages, start=1):
+        debug_text.append(f"Page {page_num}:\n{text[:500]}...\n{'-'*50}\n")
+        page_tokens = document.page_tokens(page_num)
+        for key, kind in kinds.items():
+            for token in page_tokens:
+                if token.kind != kind:
+                    continue
+                results[key].append(Match(page_num, token.start, token.end, kind))
 
     debug_file = output_dir / f"extracted_text_{Path(pdf_path).stem}.txt"
     with open(debug_file, "w", encoding="utf-8") as f:
         f.write("".join(debug_text))
 
-    return results, full_text, debug_text
+    return results, debug_text
 
-def find_page_number(full_text, sentence, pdf_path):
-    try:
-        with fitz.open(pdf_path) as pdf:
-            for page_num, page in enumerate(pdf, start=1):
-                text = page.get_text("text") or ""
-                if sentence in text:
-                    return page_num
-        return "Unknown"
-    except Exception:
-        return "Unknown"
+# Sentences of a document's full_text, split on SENTENCE_DELIMITERS in a single pass and indexed by
+# the kinds of token they contain, so that the percentage check only visits candidate sentences
+class SentenceIndex:
+    def __init__(self, document):
+        self.document = document
+        self.breaks = [(match.start(), match.group()) for match in SENTENCE_BREAK.finditer(document.full_text)]
+        self._bounds = {}
+        self._kind_sentences = {}
 
-def find_percentage_in_context(standard, full_text, pdf_path, debug_text=None):
-    standard_pattern = (
-        re.compile(r"M4\s*\(?\s*2\s*\)?|Category\s*2\s*(?:Accessible\s*and\s*Adaptable)?", re.IGNORECASE)
-        if standard == "M4(2)"
-        else re.compile(r"M4\s*\(?\s*3\s*\)?|Category\s*3\s*(?:Wheelchair\s*User\s*Dwellings)?", re.IGNORECASE)
-    )
-    percent_pattern = re.compile(r"(\d{1,3})\s*(?:%|\b(?:percent|per\s*cent)\b)|(?:\b(ninety|ten|one\s*hundred)\s*(?:percent|per\s*cent)\b)", re.IGNORECASE)
+    def _index(self, delimiters):
+        # bounds[i] and bounds[i + 1] are the delimiters around sentence i; each kind maps to the
+        # sentences holding a token of that kind (tokens never start on a delimiter or whitespace)
+        if delimiters not in self._bounds:
+            bounds = [-1] + [pos for pos, char in self.breaks if char in delimiters] + [len(self.document.full_text)]
+            kind_sentences = {}
+            for token in self.document.tokens():
+                sentences = kind_sentences.setdefault(token.kind, [])
+                index = bisect.bisect_right(bounds, token.start) - 1
+                if not sentences or sentences[-1] != index:
+                    sentences.append(index)
+            self._bounds[delimiters] = bounds
+            self._kind_sentences[delimiters] = kind_sentences
+        return self._bounds[delimiters], self._kind_sentences[delimiters]
+
+    # (sentence, start, end) for each sentence containing a token of the given kind, in order, with
+    # the sentence stripped and start and end its full_text offsets
+    def candidates(self, kind, delimiters="."):
+        bounds, kind_sentences = self._index(delimiters)
+        full_text = self.document.full_text
+        for index in kind_sentences.get(kind, []):
+            raw = full_text[bounds[index] + 1:bounds[index + 1]]
+            sentence = raw.strip()
+            start = bounds[index] + 1 + len(raw) - len(raw.lstrip())
+            yield sentence, start, start + len(sentence)
 
-    sentences = [s.strip() for s in full_text.split(".") if s.strip()]
+def find_page_number(document, start, end):
+    if not document.page_starts:
+        return "Unknown"
+    first = document.page_numbers[bisect.bisect_right(document.page_starts, start) - 1]
+    last = document.page_numbers[bisect.bisect_right(document.page_starts, max(start, end - 1)) - 1]
+    return first if first == last else f"{first}-{last}"
+
+def find_percentage_in_context(standard, document, debug_text=None):
+    standard_kind = STANDARD_KINDS[standard]
     standard_percentages = []
     notes = []
 
-    for sentence in sentences:
-        if re.search(standard_pattern, sentence):
-            percent_matches = percent_pattern.finditer(sentence)
-            for match in percent_matches:
-                if match.group(1):
-                    percent = match.group(1) + "%"
-                elif match.group(2):
-                    percent = NUMBER_WORDS.get(match.group(2).lower(), "Unknown") + "%"
-                standard_percentages.append(percent)
-                page_num = find_page_number(full_text, sentence, pdf_path)
+    for sentence, sentence_start, sentence_end in document.sentences().candidates(standard_kind):
+        sentence_tokens = document.tokens_between(sentence_start, sentence_end)
+        if first_token(sentence_tokens, standard_kind):
+            for token in sentence_tokens:
+                if token.kind != "pct":
+                    continue
+                standard_percentages.append(percent_value(token))
+                page_num = find_page_number(document, sentence_start, sentence_end)
                 display_sentence = summarize_text(sentence, max_words=50) if len(sentence.split()) > 100 else sentence
                 notes.append({"page": page_num, "sentence": display_sentence})
             if standard_percentages:
@@ -245,20 +571,50 @@ def find_percentage_in_context(standard, full_text, pdf_path, debug_text=None):
     percentage = "/".join(standard_percentages) + "*" if len(standard_percentages) > 1 else standard_percentages[0] if standard_percentages else "N/A"
     return percentage, notes
 
+def init_progress_worker(connection):
+    global progress_events
+    progress_events = connection
+
+def report_progress(pdf_path, status=None, **counts):
+    if progress_events is not None:
+        progress_events.send(("event", (str(pdf_path), status, counts)))
+
 def process_pdf(args):
-    pdf_path, output_dir = args
+    # pdf_data is the PDF's bytes for uploads held in memory, or None to read pdf_path from disk
+    pdf_path, output_dir, pdf_data = args
     debug_text = [f"Starting processing for {pdf_path}\n"]
+    imported = set(IMPORT_SECONDS)
     try:
-        results, full_text, search_debug = search_pdf_for_standards(pdf_path, output_dir)
-        debug_text.extend(search_debug)
-        if results is None:
+        pdf_data = load_pdf_data(pdf_path, pdf_data)
+        # Unchanged PDFs are served from the result cache without reprocessing
+        cache_key = f"{hashlib.sha256(pdf_data).hexdigest()}:{EXTRACTOR_VERSION}"
+        cached = result_cache.get(cache_key)
+        if cached:
+            json_file = output_dir / f"summary_{Path(pdf_path).stem}.json"
+            with open(json_file, "w") as f:
+                json.dump(cached["summary"], f, indent=2)
+            csv_data = dict(cached["csv_data"], **{"Local Planning Authority": Path(pdf_path).stem})
+            debug_text.append(f"Loaded cached result for {pdf_path} (key {cache_key})\n")
+            report_progress(pdf_path, pages_total=len(cached["pages"]), pages_done=len(cached["pages"]))
+            return csv_data, debug_text, json_file
+
+        document = extract_document_text(pdf_path, pdf_data, debug_text)
+        if document is None:
             debug_text.append(f"Failed to process {pdf_path}: No results returned.\n")
             return None, debug_text, None
 
-        authority_name, doc_date, pdf_url = extract_metadata(pdf_path, output_dir)
+        report_progress(pdf_path, "analysing")
+        summarizer.start_document()
+        results, search_debug = search_pdf_for_standards(document, output_dir)
+        debug_text.extend(search_debug)
+
+        authority_name, doc_date, pdf_url = extract_metadata(document, output_dir)
         debug_text.append(f"Metadata extracted: Authority={authority_name}, Date={doc_date}\n")
-        m4_2_percent, m4_2_notes = find_percentage_in_context("M4(2)", full_text, pdf_path, debug_text)
-        m4_3_percent, m4_3_notes = find_percentage_in_context("M4(3)", full_text, pdf_path, debug_text)
+        m4_2_percent, m4_2_notes = find_percentage_in_context("M4(2)", document, debug_text)
+        m4_3_percent, m4_3_notes = find_percentage_in_context("M4(3)", document, debug_text)
+        new_imports = [f"{name} ({seconds:.2f}s)" for name, seconds in IMPORT_SECONDS.items() if name not in imported]
+        if new_imports:
+            debug_text.append(f"Imported {', '.join(new_imports)}\n")
 
         plan_period = "Unknown"  # Simplified for brevity
         notes_text = []
@@ -290,125 +646,676 @@ def process_pdf(args):
             "Notes": notes_str
         }
         print(f"Processed {pdf_path}: {csv_data}")  # Debug print
+        # Summaries that fell back to leading words are not cached, so a re-run can replace them
+        if summarizer.fell_back:
+            debug_text.append("Not caching the result: some summaries used leading words instead of LexRank\n")
+        else:
+            result_cache.put(cache_key, {
+                "csv_data": csv_data,
+                "summary": summary,
+                "method": document.method,
+                "pages": document.pages,
+            })
         return csv_data, debug_text, json_file
     except Exception as e:
         debug_text.append(f"Error processing {pdf_path}: {str(e)}\n")
         return None, debug_text, None
 
-def process_uploaded_files(uploaded_files, temp_dir):
+def process_pdf_for_job(args):
+    pdf_path = args[0]
+    report_progress(pdf_path, "extracting")
+    csv_data, debug_text, json_file = process_pdf(args)
+    return pdf_path, csv_data, debug_text, json_file
+
+def process_tree_rss(pid):
+    # Resident memory in bytes of process pid and its descendants
+    psutil = lazy_import("psutil")
+    try:
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+    except psutil.Error:
+        return 0
+    rss = 0
+    for process in processes:
+        try:
+            rss += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return rss
+
+def supervised_worker(connection):
+    # Worker loop of SupervisedPool. Progress events and the results of (function, args) tasks share
+    # the worker's own pipe, so killing the worker cannot leave a lock held on a queue other workers use.
+    init_progress_worker(connection)
+    for function, args in iter(connection.recv, None):
+        try:
+            reply = ("result", function(args), None)
+        except Exception as e:
+            reply = ("result", None, f"failed: {type(e).__name__}: {e}")
+        connection.send(reply)
+
+class SupervisedPool:
+    # Worker processes that run one document at a time under the supervision of the job runner.
+    # Unlike multiprocessing.Pool, a document that runs past its timeout or whose worker uses more than
+    # WORKER_MAX_RSS_BYTES is stopped by killing the worker, and a worker that crashes or is killed is
+    # replaced, so one bad upload cannot stall the job. on_event is called with each progress event.
+    def __init__(self, processes, on_event):
+        self.on_event = on_event
+        self.max_rss = WORKER_MAX_RSS_BYTES
+        if self.max_rss:
+            try:
+                lazy_import("psutil")
+            except ImportError:
+                print("psutil is not installed; worker memory limits are disabled")
+                self.max_rss = 0
+        self.next_rss_check = 0.0
+        self.workers = [self.start_worker() for _ in range(processes)]
+
+    def start_worker(self):
+        connection, worker_connection = WORKER_CONTEXT.Pipe()
+        process = WORKER_CONTEXT.Process(target=supervised_worker, args=(worker_connection,), daemon=True)
+        process.start()
+        worker_connection.close()
+        return {"process": process, "connection": connection, "task": None, "tasks_run": 0}
+
+    def submit(self, task_id, function, args, timeout=None):
+        # The caller must not submit more tasks than there are workers before collecting results
+        worker = next(worker for worker in self.workers if worker["task"] is None)
+        worker["task"] = (task_id, timeout, time.time() + timeout if timeout else None)
+        worker["connection"].send((function, args))
+
+    def replace_worker(self, worker, kill):
+        process = worker["process"]
+        if kill and process.is_alive():
+            try:
+                psutil = lazy_import("psutil")
+                children = psutil.Process(process.pid).children(recursive=True)
+            except Exception:
+                children = []
+            process.kill()
+            for child in children:
+                try:
+                    child.kill()
+                except Exception:
+                    pass
+        elif process.is_alive():
+            worker["connection"].send(None)
+        process.join()
+        worker["connection"].close()
+        self.workers[self.workers.index(worker)] = self.start_worker()
+
+    def next_result(self):
+        # Returns (task_id, result, error) for the next task to finish. error is None on success, or
+        # "<kind>: <detail>" where kind is failed (the task raised), timeout, memory or crashed.
+        while True:
+            busy = [worker for worker in self.workers if worker["task"] is not None]
+            ready = multiprocessing.connection.wait(
+                [worker["connection"] for worker in busy], timeout=SUPERVISOR_POLL_SECONDS
+            )
+            # Limits are checked on every pass, before any messages, so that a worker sending a steady
+            # stream of progress events is still stopped; memory is measured at most once per poll interval
+            now = time.time()
+            check_rss = self.max_rss and now >= self.next_rss_check
+            if check_rss:
+                self.next_rss_check = now + SUPERVISOR_POLL_SECONDS
+            for worker in busy:
+                task_id, timeout, deadline = worker["task"]
+                error = None
+                if deadline is not None and now > deadline:
+                    error = f"timeout: stopped after {timeout:.0f}s"
+                elif check_rss:
+                    rss = process_tree_rss(worker["process"].pid)
+                    if rss > self.max_rss:
+                        error = f"memory: stopped using {rss / 1024 / 1024:.0f} MB"
+                if error:
+                    self.replace_worker(worker, kill=True)
+                    return task_id, None, error
+            for worker in busy:
+                if worker["connection"] not in ready:
+                    continue
+                task_id = worker["task"][0]
+                try:
+                    message = worker["connection"].recv()
+                except (EOFError, OSError):
+                    worker["process"].join()
+                    error = f"crashed: worker exited with code {worker['process'].exitcode}"
+                    self.replace_worker(worker, kill=True)
+                    return task_id, None, error
+                if message[0] == "event":
+                    self.on_event(*message[1])
+                    continue
+                _, result, error = message
+                worker["task"] = None
+                worker["tasks_run"] += 1
+                if WORKER_MAX_TASKS and worker["tasks_run"] >= WORKER_MAX_TASKS:
+                    self.replace_worker(worker, kill=False)
+                return task_id, result, error
+
+    def close(self):
+        # Busy workers are killed rather than waited for
+        for worker in self.workers:
+            process = worker["process"]
+            if worker["task"] is not None:
+                process.kill()
+            elif process.is_alive():
+                try:
+                    worker["connection"].send(None)
+                except OSError:
+                    process.kill()
+            process.join()
+            worker["connection"].close()
+        self.workers = []
+
+def notify_progress():
+    # Caller must hold progress_lock
+    global progress_version
+    progress_version += 1
+    progress_changed.notify_all()
+
+def start_progress(job_id, file_names):
+    with progress_lock:
+        job_progress[job_id] = {
+            "total": len(file_names),
+            "current": 0,
+            "message": "Starting processing...",
+            "started": time.time(),
+            "pages_done": 0,
+            "pages_total": 0,
+            "errors": [],
+            "files": {name: {"status": "queued", "pages_done": 0, "pages_total": None} for name in file_names},
+        }
+        notify_progress()
+
+def update_file_progress(job_id, file_name, status=None, pages_total=None, pages_done=None, error=None):
+    with progress_lock:
+        state = job_progress[job_id]
+        file_state = state["files"][file_name]
+        if file_state["status"] in ("done", "failed"):
+            # Late page events from the worker must not reopen a finished file
+            return
+        if pages_total is not None:
+            state["pages_total"] += pages_total - (file_state["pages_total"] or 0)
+            file_state["pages_total"] = pages_total
+        if pages_done is not None:
+            state["pages_done"] += pages_done - file_state["pages_done"]
+            file_state["pages_done"] = pages_done
+        if status:
+            file_state["status"] = status
+        if status in ("done", "failed"):
+            state["current"] += 1
+            state["message"] = f"Processing PDF {state['current']} of {state['total']}"
+            if file_state["pages_total"] is not None:
+                state["pages_done"] += file_state["pages_total"] - file_state["pages_done"]
+                file_state["pages_done"] = file_state["pages_total"]
+        if status == "failed":
+            file_state["error"] = error
+            state["errors"].append(f"{file_name}: {error}")
+        notify_progress()
+
+def estimate_remaining_seconds(state):
+    # Throughput in pages per second over finished files, applied to the pages still to do.
+    # Files that have not been opened yet are assumed to be of average length.
+    finished = [f for f in state["files"].values() if f["status"] in ("done", "failed")]
+    finished_pages = sum(f["pages_total"] or 0 for f in finished)
+    elapsed = time.time() - state["started"]
+    if not finished_pages or elapsed <= 0:
+        return None
+    known = [f["pages_total"] for f in state["files"].values() if f["pages_total"] is not None]
+    average_pages = sum(known) / len(known)
+    remaining_pages = sum(
+        (f["pages_total"] if f["pages_total"] is not None else average_pages) - f["pages_done"]
+        for f in state["files"].values() if f["status"] not in ("done", "failed")
+    )
+    return max(0, round(remaining_pages / (finished_pages / elapsed)))
+
+def progress_snapshot(job_id):
+    with progress_lock:
+        state = job_progress.get(job_id)
+        if state is None:
+            return None
+        status_counts = {}
+        # Files still in progress count towards the percentage by the share of their pages read
+        completed = state["current"]
+        for file_state in state["files"].values():
+            status_counts[file_state["status"]] = status_counts.get(file_state["status"], 0) + 1
+            if file_state["status"] not in ("done", "failed") and file_state["pages_total"]:
+                completed += file_state["pages_done"] / file_state["pages_total"]
+        return {
+            'current': state["current"],
+            'total': state["total"],
+            'percentage': (completed / state["total"] * 100) if state["total"] > 0 else 0,
+            'message': state["message"],
+            'pages_done': state["pages_done"],
+            'pages_total': state["pages_total"],
+            'eta_seconds': estimate_remaining_seconds(state),
+            'errors': list(state["errors"]),
+            'status_counts': status_counts,
+            'files': {name: dict(file_state) for name, file_state in state["files"].items()},
+        }
+
+class AppendOnlyFile:
+    # Hides seek/tell from ZipFile so it writes entries strictly in order (with data descriptors)
+    # instead of seeking back to patch headers; the bytes on disk are then always a valid prefix.
+    def __init__(self, fp):
+        self.fp = fp
+
+    def write(self, data):
+        return self.fp.write(data)
+
+    def flush(self):
+        self.fp.flush()
+
+def add_to_zip(zipf, file_path):
+    # Small files are stored as-is; compressing them costs more time than the space it saves
+    size = file_path.stat().st_size
+    compress_type = zipfile.ZIP_STORED if size <= ZIP_STORE_MAX_BYTES else zipfile.ZIP_DEFLATED
+    zipf.write(file_path, file_path.name, compress_type=compress_type)
+
+# uploaded_files maps each file's display name (its path within the upload) to its saved path;
+# upload_data holds the bytes of files that were kept in memory instead
+def process_uploaded_files(job_id, uploaded_files, temp_dir, upload_data=None):
     output_dir = Path(temp_dir) / "output_files"
     output_dir.mkdir(exist_ok=True)
     csv_file = output_dir / "summary_output.csv"
     error_log_file = output_dir / "error_log.txt"
+    zip_path = Path(temp_dir) / "results.zip"
     error_log = []
     all_csv_data = []
-    json_files = []
 
-    with progress_lock:
-        progress["total"] = len(uploaded_files)
-        progress["current"] = 0
-        progress["message"] = "Starting processing..."
+    start_progress(job_id, list(uploaded_files))
+    names_by_path = {str(pdf_path): name for name, pdf_path in uploaded_files.items()}
 
+    upload_data = upload_data or {}
     tasks = []
-    for pdf_path in uploaded_files:
-        tasks.append((pdf_path, output_dir))
+    for name, pdf_path in uploaded_files.items():
+        tasks.append((pdf_path, output_dir, upload_data.pop(name, None)))
 
-    for result in tqdm(tasks, desc="Processing PDFs", total=len(tasks)):
-        csv_data, debug_text, json_file = process_pdf(result)
-        with progress_lock:
-            progress["current"] += 1
-            progress["message"] = f"Processing PDF {progress['current']} of {progress['total']}"
-        if csv_data:
-            all_csv_data.append(csv_data)
-        if json_file:
-            json_files.append(json_file)
-        error_log.extend(debug_text)
-
-    # Ensure CSV is written even if no data, with a header
-    if not all_csv_data:
-        all_csv_data = [{"Local Planning Authority": "N/A", "Date of Doc/Status": "N/A", "Plan Period": "N/A", 
-                        "M4(2) Percentage": "N/A", "M4(3) Percentage": "N/A", "Notes": "No data processed"}]
-
-    all_csv_data.sort(key=lambda x: x["Local Planning Authority"].lower())
-
-    with open(csv_file, "w", newline="", encoding="utf-8") as f:
-        fieldnames = ["Local Planning Authority", "Date of Doc/Status", "Plan Period", "M4(2) Percentage", "M4(3) Percentage", "Notes"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for csv_data in all_csv_data:
-            writer.writerow(csv_data)
-
-    with open(error_log_file, "w", encoding="utf-8") as f:
-        f.write("\n".join(error_log))
+    # The archive is written append-only as results arrive, so it can be downloaded while it grows
+    with open(zip_path, "wb") as zip_stream, zipfile.ZipFile(AppendOnlyFile(zip_stream), 'w') as zipf:
+        num_processes = max(1, min(WEB_WORKERS, len(tasks)))
+        pool = SupervisedPool(
+            num_processes,
+            lambda pdf_path, status, counts: update_file_progress(job_id, names_by_path[pdf_path], status, **counts)
+        )
+        pending = deque(tasks)
+        in_flight = 0
+        try:
+            with tqdm(desc="Processing PDFs", total=len(tasks)) as bar:
+                while pending or in_flight:
+                    while pending and in_flight < num_processes:
+                        task = pending.popleft()
+                        pool.submit(task[0], process_pdf_for_job, task, TASK_TIMEOUT_SECONDS or None)
+                        in_flight += 1
+                    pdf_path, result, error = pool.next_result()
+                    in_flight -= 1
+                    if error is not None:
+                        result = (pdf_path, None, [f"Starting processing for {pdf_path}\n", f"Error: {pdf_path}: {error}\n"], None)
+                    pdf_path, csv_data, debug_text, json_file = result
+                    if json_file:
+                        add_to_zip(zipf, json_file)
+                        json_file.unlink()
+                        zip_stream.flush()
+                    if csv_data:
+                        update_file_progress(job_id, names_by_path[str(pdf_path)], "done")
+                        all_csv_data.append(csv_data)
+                    else:
+                        # Documents that fail, or are stopped by the supervisor, get a CSV row saying why.
+                        # The message is shown in the browser, so it names the upload, not the server path.
+                        name = names_by_path[str(pdf_path)]
+                        error = error or f"failed: {debug_text[-1].strip().replace(str(pdf_path), name)}"
+                        update_file_progress(job_id, name, "failed", error=error)
+                        all_csv_data.append({"Local Planning Authority": Path(pdf_path).stem, "Date of Doc/Status": "N/A", "Plan Period": "N/A",
+                                             "M4(2) Percentage": "N/A", "M4(3) Percentage": "N/A", "Notes": "", "Error": error})
+                    error_log.extend(debug_text)
+                    bar.update()
+        finally:
+            pool.close()
+
+        # Ensure CSV is written even if no data, with a header
+        if not all_csv_data:
+            all_csv_data = [{"Local Planning Authority": "N/A", "Date of Doc/Status": "N/A", "Plan Period": "N/A", 
+                            "M4(2) Percentage": "N/A", "M4(3) Percentage": "N/A", "Notes": "No data processed"}]
+
+        all_csv_data.sort(key=lambda x: x["Local Planning Authority"].lower())
+
+        with open(csv_file, "w", newline="", encoding="utf-8") as f:
+            fieldnames = ["Local Planning Authority", "Date of Doc/Status", "Plan Period", "M4(2) Percentage", "M4(3) Percentage", "Notes", "Error"]
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for csv_data in all_csv_data:
+                writer.writerow(csv_data)
+
+        with open(error_log_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(error_log))
+
+        add_to_zip(zipf, csv_file)
+        add_to_zip(zipf, error_log_file)
 
     with progress_lock:
-        progress["message"] = "Processing complete!"
+        job_progress[job_id]["message"] = "Processing complete!"
+        notify_progress()
 
-    return csv_file, json_files, error_log_file
+    return zip_path
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/upload', methods=['POST'])
-def upload_files():
-    if 'files' not in request.files:
-        return jsonify({'error': 'No files uploaded'}), 400
+def save_job(job):
+    # Persist the job record next to its files so status and results survive a restart
+    with open(Path(job["dir"]) / "job.json", "w", encoding="utf-8") as f:
+        json.dump(job, f, indent=2)
 
-    uploaded_files = request.files.getlist('files')
-    if not uploaded_files or all(f.filename == '' for f in uploaded_files):
-        return jsonify({'error': 'No valid files uploaded'}), 400
+def update_job(job_id, **fields):
+    with jobs_lock:
+        job = jobs[job_id]
+        job.update(fields)
+        save_job(job)
+        with progress_lock:
+            notify_progress()
+        return dict(job)
+
+def load_jobs():
+    # Caller must hold jobs_lock. Jobs saved by earlier servers are loaded once per process; it is
+    # not done at import because worker processes import this module too.
+    global jobs_loaded
+    if jobs_loaded:
+        return
+    jobs_loaded = True
+    if not JOBS_DIR.is_dir():
+        return
+    for job_file in JOBS_DIR.glob("*/job.json"):
+        try:
+            with open(job_file, encoding="utf-8") as f:
+                job = json.load(f)
+        except Exception as e:
+            print(f"Skipping unreadable job record {job_file}: {e}")
+            continue
+        if job["id"] in jobs:
+            continue
+        if job["status"] in ("queued", "running"):
+            job.update(status="failed", message="Processing was interrupted by a server restart", finished=time.time())
+            save_job(job)
+        jobs[job["id"]] = job
+
+def cleanup_expired_jobs():
+    now = time.time()
+    with jobs_lock:
+        expired = [
+            job_id for job_id, job in jobs.items()
+            if job.get("finished") and now - job["finished"] > JOB_RETENTION_SECONDS
+        ]
+        for job_id in expired:
+            shutil.rmtree(jobs.pop(job_id)["dir"], ignore_errors=True)
+    with progress_lock:
+        for job_id in expired:
+            job_progress.pop(job_id, None)
+    # Spooled uploads left behind by requests that never finished, e.g. when the server stopped
+    for spool_path in (JOBS_DIR / "incoming").glob("*.upload"):
+        try:
+            if now - spool_path.stat().st_mtime > JOB_RETENTION_SECONDS:
+                spool_path.unlink()
+        except OSError:
+            pass
+
+def upload_input_path(input_dir, name):
+    # Where an uploaded file goes under input_dir, given its name (its path within the upload), or
+    # None if the name is absolute or has ".." parts and so could point outside input_dir
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+    if not parts or name.startswith(("/", "\\")) or ".." in parts or ":" in parts[0]:
+        return None
+    return input_dir.joinpath(*parts)
 
-    temp_dir = tempfile.mkdtemp()
+def spill_uploads(pdf_data, input_dir):
+    # Writes in-memory uploads into the job's input directory when they no longer fit in memory
+    for name, data in pdf_data.items():
+        file_path = upload_input_path(input_dir, name)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(data)
+    pdf_data.clear()
+
+def run_job(job_id):
+    global job_upload_bytes
+    with jobs_lock:
+        job = dict(jobs[job_id])
+    job_dir = Path(job["dir"])
+    update_job(job_id, status="running", started=time.time(), message="Processing...")
     try:
-        # Create output directory
-        output_dir = Path(temp_dir) / "output_files"
-        output_dir.mkdir(exist_ok=True)
+        pdf_paths = {name: upload_input_path(job_dir / "input", name) for name in job["files"]}
+        with jobs_lock:
+            upload_data = job_uploads.pop(job_id, {})
+        upload_bytes = sum(len(data) for data in upload_data.values())
+        try:
+            zip_path = process_uploaded_files(job_id, pdf_paths, job_dir, upload_data)
+        finally:
+            with jobs_lock:
+                job_upload_bytes -= upload_bytes
+        outcome = dict(status="complete", message="Processing complete!", result=str(zip_path))
+    except Exception as e:
+        with progress_lock:
+            if job_id in job_progress:
+                job_progress[job_id]["message"] = f"Processing failed: {str(e)}"
+            notify_progress()
+        (job_dir / "results.zip").unlink(missing_ok=True)
+        outcome = dict(status="failed", message=f"Processing failed: {str(e)}")
+    # Only the results are retained; the uploaded PDFs and intermediate files are removed
+    shutil.rmtree(job_dir / "input", ignore_errors=True)
+    shutil.rmtree(job_dir / "output_files", ignore_errors=True)
+    update_job(job_id, finished=time.time(), **outcome)
+
+def job_runner():
+    while True:
+        try:
+            job_id = job_queue.get(timeout=600)
+        except queue.Empty:
+            cleanup_expired_jobs()
+            continue
+        try:
+            run_job(job_id)
+        finally:
+            job_queue.task_done()
+            cleanup_expired_jobs()
 
-        # Save all uploaded files to a temporary directory, preserving folder structure
-        all_pdf_paths = []
+def start_job_runners():
+    with jobs_lock:
+        load_jobs()
+        while len(job_runners) < JOB_RUNNERS:
+            runner = threading.Thread(target=job_runner, name=f"job-runner-{len(job_runners)}", daemon=True)
+            runner.start()
+            job_runners.append(runner)
+
+@app.before_request
+def ensure_job_runners():
+    # Under `flask run` or a WSGI server the first request loads saved jobs and starts the runners,
+    # which also remove expired jobs
+    start_job_runners()
+
+def public_job(job):
+    return {
+        'job_id': job["id"],
+        'status': job["status"],
+        'message': job["message"],
+        'pdf_count': len(job["files"]),
+        'created': job["created"],
+        'started': job.get("started"),
+        'finished': job.get("finished"),
+        'status_url': f"/jobs/{job['id']}",
+        'result_url': f"/jobs/{job['id']}/result" if job["status"] == "complete" else None,
+        'progress': progress_snapshot(job["id"]),
+    }
+
+@app.route('/upload', methods=['POST'])
+def upload_files():
+    global job_upload_bytes
+    job_id = uuid.uuid4().hex
+    job_dir = JOBS_DIR / job_id
+    input_dir = job_dir / "input"
+    try:
+        # Parsing the form spools large uploads to disk, so it happens inside the try: they are
+        # removed below however the request ends
+        if 'files' not in request.files:
+            return jsonify({'error': 'No files uploaded'}), 400
+
+        uploaded_files = request.files.getlist('files')
+        if not uploaded_files or all(f.filename == '' for f in uploaded_files):
+            return jsonify({'error': 'No valid files uploaded'}), 400
+
+        cleanup_expired_jobs()
+        # Keep in-memory uploads as bytes and move spooled ones into the job's input directory,
+        # preserving folder structure
+        pdf_names = []
+        pdf_data = {}
         for uploaded_file in uploaded_files:
-            if uploaded_file.filename != '':
-                # The filename includes the relative path from the selected folder
-                file_path = Path(temp_dir) / uploaded_file.filename
+            stream = uploaded_file.stream
+            if uploaded_file.filename == '' or not uploaded_file.filename.lower().endswith('.pdf'):
+                continue
+            # The filename includes the relative path from the selected folder; it is kept as the
+            # file's display name, and files whose names would leave the input directory are skipped
+            file_path = upload_input_path(input_dir, uploaded_file.filename)
+            if file_path is None:
+                continue
+            pdf_names.append(uploaded_file.filename)
+            if isinstance(stream, io.BytesIO):
+                pdf_data[uploaded_file.filename] = stream.getvalue()
+            else:
                 file_path.parent.mkdir(parents=True, exist_ok=True)
-                uploaded_file.save(file_path)
-                if file_path.suffix.lower() == '.pdf':
-                    all_pdf_paths.append(file_path)
+                stream.close()
+                os.replace(stream.name, file_path)
 
-        if not all_pdf_paths:
+        if not pdf_names:
+            shutil.rmtree(job_dir, ignore_errors=True)
             return jsonify({'error': 'No PDF files found in the upload'}), 400
 
-        csv_file, json_files, error_log_file = process_uploaded_files(all_pdf_paths, temp_dir)
-        zip_path = Path(temp_dir) / 'results.zip'
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            zipf.write(csv_file, csv_file.name)
-            for json_file in json_files:
-                zipf.write(json_file, json_file.name)
-            zipf.write(error_log_file, error_log_file.name)
+        upload_bytes = sum(len(data) for data in pdf_data.values())
+        if job_upload_bytes + upload_bytes > UPLOAD_MEMORY_MAX_BYTES:
+            spill_uploads(pdf_data, input_dir)
+            upload_bytes = 0
 
-        return send_file(
-            zip_path,
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name='pdf_processing_results.zip'
-        )
+        job_dir.mkdir(parents=True, exist_ok=True)
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "message": "Waiting to start...",
+            "dir": str(job_dir),
+            "files": pdf_names,
+            "created": time.time(),
+        }
+        with jobs_lock:
+            # Another upload may have been queued since the check above
+            if job_upload_bytes + upload_bytes > UPLOAD_MEMORY_MAX_BYTES:
+                spill_uploads(pdf_data, input_dir)
+                upload_bytes = 0
+            job_upload_bytes += upload_bytes
+            jobs[job_id] = job
+            job_uploads[job_id] = pdf_data
+            save_job(job)
+        job_queue.put(job_id)
+        start_job_runners()
+        return jsonify(public_job(job)), 202
     except Exception as e:
-        with progress_lock:
-            progress["message"] = f"Processing failed: {str(e)}"
-        return jsonify({'error': f'Processing failed: {str(e)}'}), 500
+        shutil.rmtree(job_dir, ignore_errors=True)
+        return jsonify({'error': f'Upload failed: {str(e)}'}), 500
     finally:
-        shutil.rmtree(temp_dir, ignore_errors=True)
+        # Remove spooled uploads that were not moved into the job (other fields, non-PDFs, rejected
+        # or failed uploads)
+        for spool in request.spooled_uploads:
+            spool.close()
+            Path(spool.name).unlink(missing_ok=True)
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    with jobs_lock:
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Unknown job'}), 404
+        return jsonify(public_job(job))
+
+def follow_result(job_id, zip_path):
+    # Stream the archive while it is still being written, ending once the job has finished
+    with open(zip_path, "rb") as f:
+        while True:
+            with jobs_lock:
+                finished = jobs.get(job_id, {}).get("status") != "running"
+            chunk = f.read(64 * 1024)
+            if chunk:
+                yield chunk
+                continue
+            if finished:
+                return
+            with progress_changed:
+                progress_changed.wait(timeout=1)
+
+@app.route('/jobs/<job_id>/result')
+def get_job_result(job_id):
+    with jobs_lock:
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({'error': 'Unknown job'}), 404
+        job = dict(job)
+    zip_path = Path(job["dir"]) / "results.zip"
+    if job["status"] == "running" and request.args.get('follow') and zip_path.exists():
+        return Response(
+            follow_result(job_id, zip_path),
+            mimetype='application/zip',
+            headers={'Content-Disposition': 'attachment; filename=pdf_processing_results.zip'}
+        )
+    if job["status"] != "complete":
+        return jsonify({'error': f'Job is {job["status"]}', 'status': job["status"]}), 409
+    return send_file(
+        job["result"],
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name='pdf_processing_results.zip'
+    )
 
 @app.route('/progress')
 def get_progress():
-    with progress_lock:
-        return jsonify({
-            'current': progress["current"],
-            'total': progress["total"],
-            'percentage': (progress["current"] / progress["total"] * 100) if progress["total"] > 0 else 0,
-            'message': progress["message"]
-        })
+    job_id = request.args.get('job_id', '')
+    snapshot = progress_snapshot(job_id)
+    if snapshot is None:
+        return jsonify({'error': 'No progress for this job'}), 404
+    return jsonify(snapshot)
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_job_events(job_id):
+    seen_version = -1
+    sent_files = {}
+    while True:
+        with progress_changed:
+            changed = progress_changed.wait_for(lambda: progress_version != seen_version, timeout=SSE_KEEPALIVE_SECONDS)
+            seen_version = progress_version
+        if not changed:
+            yield ": keep-alive\n\n"
+            continue
+        with jobs_lock:
+            job = jobs.get(job_id)
+            if job is None:
+                yield format_sse("error", {'error': 'Unknown job'})
+                return
+            payload = public_job(job)
+        # One "file" event for each file whose status or page count changed, then the job summary
+        files = payload["progress"].pop("files") if payload["progress"] else {}
+        for name, file_state in files.items():
+            if sent_files.get(name) != file_state:
+                sent_files[name] = file_state
+                yield format_sse("file", dict(file_state, name=name))
+        yield format_sse("progress", payload)
+        if payload["status"] in ("complete", "failed"):
+            return
+
+@app.route('/progress/stream')
+def stream_progress():
+    job_id = request.args.get('job_id', '')
+    with jobs_lock:
+        if job_id not in jobs:
+            return jsonify({'error': 'Unknown job'}), 404
+    return Response(
+        stream_job_events(job_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file